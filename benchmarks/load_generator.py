@@ -0,0 +1,197 @@
+"""
+模拟大量客户端安装的并发负载生成器
+
+每个虚拟客户端拥有独立的AsyncApiClient、机器码和软件标识，按真实会话节奏调用接口：
+登录 -> 状态检测 -> 取到期时间/剩余点数/公告，之后每5分钟状态检测、每20分钟获取公告，
+工作期间定期扣点。--time-scale 按比例压缩这些间隔，便于在短时间内模拟长时间运行。
+
+    # 另开终端启动模拟服务（用户数不少于客户端数）
+    python src/api_simulator.py --users 2000 --billing points --status-interval 0
+    python benchmarks/load_generator.py --clients 2000 --duration 120 --time-scale 60 \\
+        --base-url http://127.0.0.1:8081/ --base-url http://127.0.0.1:8082/
+
+不指定 --base-url 时在进程内启动模拟服务。
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+import aiohttp
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from api_metrics import outcome_of  # noqa: E402
+from api_simulator import ApiSimulator, SimulatedBackend  # noqa: E402
+from async_api_client import AsyncApiClient  # noqa: E402
+
+STATUS_INTERVAL = 5 * 60     # 状态检测间隔（秒）
+ANNOUNCE_INTERVAL = 20 * 60  # 公告检查间隔（秒）
+WORK_INTERVAL = 30           # 扣点间隔（秒）
+
+
+class LoadStats:
+    """汇总所有虚拟客户端的调用结果"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.outcomes = Counter()
+        self.sessions_started = 0
+        self.sessions_failed = 0
+
+    def record(self, endpoint: str, latency: float, result):
+        self.latencies[endpoint].append(latency)
+        self.outcomes[(endpoint, outcome_of(result))] += 1
+
+
+async def timed(stats: LoadStats, endpoint: str, call):
+    start = time.perf_counter()
+    result = await call
+    stats.record(endpoint, time.perf_counter() - start, result)
+    return result
+
+
+async def virtual_client(index: int, args, base_urls: List[str], stats: LoadStats,
+                         stop_at: float, clients: List[AsyncApiClient]):
+    """单个虚拟客户端的完整会话"""
+    await asyncio.sleep(random.uniform(0, args.ramp))
+    client = AsyncApiClient(
+        soft_id=f"soft{index % args.soft_ids:03d}", version="1.0", mac=f"vm{index:010d}",
+        base_urls=base_urls, cache_ttls={}, rate_limit=args.rate_limit
+    )
+    clients.append(client)
+    user_name = f"user{index % args.users + 1:06d}"
+    password = f"pass{index % args.users + 1:06d}"
+    scale = args.time_scale
+    stats.sessions_started += 1
+    try:
+        success, token = await timed(stats, "USER_LOGIN", client.user_login(user_name, password))
+        if not success:
+            stats.sessions_failed += 1
+            return
+        await timed(stats, "CHECK_USER_STATUS", client.check_user_status(user_name, token))
+        await asyncio.gather(
+            timed(stats, "GET_EXPIRY_TIME", client.get_expiry_time(user_name, password)),
+            timed(stats, "GET_REMAINING_POINTS", client.get_remaining_points(user_name, password)),
+            timed(stats, "GET_ANNOUNCEMENT", client.get_announcement()),
+        )
+        now = time.monotonic()
+        next_status = now + STATUS_INTERVAL / scale
+        next_announce = now + ANNOUNCE_INTERVAL / scale
+        next_work = now + random.uniform(0, WORK_INTERVAL / scale)
+        while True:
+            wake_at = min(next_status, next_announce, next_work)
+            if wake_at >= stop_at:
+                break
+            await asyncio.sleep(max(0.0, wake_at - time.monotonic()))
+            now = time.monotonic()
+            if now >= next_status:
+                next_status += STATUS_INTERVAL / scale
+                await timed(stats, "CHECK_USER_STATUS", client.check_user_status(user_name, token))
+            if now >= next_announce:
+                next_announce += ANNOUNCE_INTERVAL / scale
+                await timed(stats, "GET_ANNOUNCEMENT", client.get_announcement())
+            if now >= next_work:
+                next_work += WORK_INTERVAL / scale
+                await timed(stats, "DEDUCT_POINTS", client.deduct_points(user_name, token, 1))
+    finally:
+        await client.aclose()
+
+
+async def set_primary_down(base_urls: List[str], mode: str, delay: float):
+    """通过模拟服务的控制接口让主地址下线"""
+    await asyncio.sleep(delay)
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{base_urls[0]}__control", params={"primary_down": mode}) as response:
+            await response.read()
+    print(f"[{delay:.0f}s] 主地址已下线（{mode}）")
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(int(len(sorted_values) * q), len(sorted_values) - 1)]
+
+
+def report(stats: LoadStats, clients: List[AsyncApiClient], elapsed: float):
+    total = sum(len(values) for values in stats.latencies.values())
+    print(f"\n会话: {stats.sessions_started}，登录失败: {stats.sessions_failed}，耗时 {elapsed:.1f}s")
+    print(f"总调用: {total}，吞吐: {total / elapsed:.1f} 次/秒\n")
+    print(f"{'接口':24s} {'次数':>8s} {'p50(ms)':>9s} {'p90(ms)':>9s} {'p99(ms)':>9s} {'max(ms)':>9s}")
+    all_latencies = []
+    for endpoint, values in sorted(stats.latencies.items()):
+        values.sort()
+        all_latencies.extend(values)
+        print(f"{endpoint:24s} {len(values):8d} {percentile(values, 0.5) * 1000:9.1f} "
+              f"{percentile(values, 0.9) * 1000:9.1f} {percentile(values, 0.99) * 1000:9.1f} "
+              f"{values[-1] * 1000:9.1f}")
+    if all_latencies:
+        all_latencies.sort()
+        print(f"{'全部':24s} {len(all_latencies):8d} {percentile(all_latencies, 0.5) * 1000:9.1f} "
+              f"{percentile(all_latencies, 0.9) * 1000:9.1f} {percentile(all_latencies, 0.99) * 1000:9.1f} "
+              f"{all_latencies[-1] * 1000:9.1f}  均值 {statistics.mean(all_latencies) * 1000:.1f}ms")
+
+    print("\n结果分布:")
+    for (endpoint, outcome), count in sorted(stats.outcomes.items()):
+        print(f"  {endpoint:24s} {outcome:16s} {count}")
+
+    failovers = timeouts = retries = hedges = 0
+    for client in clients:
+        snapshot = client.metrics.snapshot()
+        failovers += sum(snapshot["failovers"].values())
+        timeouts += sum(snapshot["timeouts"].values())
+        retries += sum(snapshot["retries"].values())
+        hedges += sum(snapshot["hedges"].values())
+    if total:
+        print(f"\n故障切换: {failovers}（{failovers / total:.2%}），超时: {timeouts}，"
+              f"重试: {retries}，对冲: {hedges}")
+
+
+async def main_async(args):
+    simulator = None
+    base_urls = args.base_url
+    if not base_urls:
+        backend = SimulatedBackend(status_interval=0, billing="points")
+        backend.seed(users=args.users, cards=0)
+        simulator = ApiSimulator(backend).start()
+        base_urls = simulator.base_urls
+    stats = LoadStats()
+    clients: List[AsyncApiClient] = []
+    start = time.monotonic()
+    stop_at = start + args.duration
+    tasks = [virtual_client(i, args, base_urls, stats, stop_at, clients) for i in range(args.clients)]
+    if args.primary_down_at is not None:
+        tasks.append(set_primary_down(base_urls, args.primary_down_mode, args.primary_down_at))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        if simulator is not None:
+            simulator.stop()
+    report(stats, clients, time.monotonic() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模拟大量客户端安装的并发负载生成器")
+    parser.add_argument("--clients", type=int, default=100, help="虚拟客户端数量")
+    parser.add_argument("--users", type=int, default=None, help="模拟服务中的用户数，默认等于客户端数")
+    parser.add_argument("--soft-ids", type=int, default=1, help="虚拟客户端轮流使用的软件标识数量")
+    parser.add_argument("--duration", type=float, default=60, help="运行时长（秒）")
+    parser.add_argument("--ramp", type=float, default=5, help="客户端在多少秒内陆续启动")
+    parser.add_argument("--time-scale", type=float, default=60,
+                        help="会话节奏压缩倍数，60表示5分钟的状态检测间隔压缩为5秒")
+    parser.add_argument("--rate-limit", action="store_true",
+                        help="启用客户端限流（限额按真实时间配置，建议仅在--time-scale 1时启用）")
+    parser.add_argument("--base-url", action="append", help="模拟服务地址，可重复；不指定则在进程内启动")
+    parser.add_argument("--primary-down-at", type=float, help="运行多少秒后让主地址下线")
+    parser.add_argument("--primary-down-mode", choices=["refuse", "hang", "error"], default="refuse")
+    args = parser.parse_args()
+    if args.users is None:
+        args.users = args.clients
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""
+ApiClient及界面热点路径的微基准测试
+
+所有网络调用都指向本地模拟服务（src/api_simulator.py），结果保存为JSON基线，
+再用compare子命令对比两次结果，中位耗时增长超过阈值即视为性能回退。
+基线与机器相关，不提交到仓库，需在同一台机器上分别测量两个提交。被测代码优先从PYTHONPATH导入，
+本脚本和模拟服务始终使用当前工作区的版本，因此可以测量不包含本脚本的旧提交：
+
+    git worktree add ../base <基线提交>
+    PYTHONPATH=../base/src python benchmarks/run_benchmarks.py run --output benchmarks/baselines/base.json
+    python benchmarks/run_benchmarks.py run --output benchmarks/baselines/new.json
+    python benchmarks/run_benchmarks.py compare benchmarks/baselines/base.json benchmarks/baselines/new.json
+    git worktree remove ../base
+
+旧版本缺少的接口（如ApiClient的cache_ttls/rate_limit参数、界面的ApiWorker）会自动回退到旧的调用方式，
+旧版本完全没有的被测功能记为跳过，compare只对比两次都有结果的基准。
+
+界面相关的基准需要PyQt5，无显示环境时会自动使用offscreen平台。
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import inspect
+from typing import Callable, Dict, List
+
+# 追加在PYTHONPATH之后：PYTHONPATH指向旧提交的src时测量旧代码，旧代码中没有的模拟服务仍从这里导入
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import api_client as api_client_module  # noqa: E402
+from api_client import ApiClient, EndpointType  # noqa: E402
+from api_simulator import ApiSimulator, SimulatedBackend  # noqa: E402
+
+SRC_DIR = os.path.dirname(os.path.abspath(api_client_module.__file__))  # 被测代码所在目录
+USER_NAME = "user000001"
+PASSWORD = "pass000001"
+
+
+def measure(fn: Callable[[], None], number: int, repeat: int = 5) -> Dict[str, float]:
+    """执行repeat轮、每轮number次，返回单次耗时（微秒）的统计"""
+    fn()  # 预热
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number * 1e6)
+    return {
+        "median_us": statistics.median(samples),
+        "min_us": min(samples),
+        "mean_us": statistics.mean(samples),
+        "number": number,
+        "repeat": repeat
+    }
+
+
+class Unsupported(Exception):
+    """被测代码中没有该基准测量的功能"""
+
+
+def tested_module(name: str):
+    """从被测代码中导入模块；只存在于当前工作区的模块（旧版本中没有）视为不支持"""
+    module = importlib.import_module(name)
+    if os.path.dirname(os.path.abspath(module.__file__)) != SRC_DIR:
+        raise Unsupported(f"{name}模块")
+    return module
+
+
+def make_client(simulator: ApiSimulator) -> ApiClient:
+    """基准用客户端：关闭缓存和限流，测量真实的请求路径；旧版本不支持的参数不传入"""
+    options = {"base_urls": simulator.base_urls, "cache_ttls": {}, "rate_limit": False}
+    accepted = inspect.signature(ApiClient).parameters
+    client = ApiClient("bench", "1.0", "bench-mac",
+                       **{name: value for name, value in options.items() if name in accepted})
+    if "base_urls" not in accepted:
+        client.base_urls = list(simulator.base_urls)
+    return client
+
+
+def close_client(client: ApiClient):
+    close = getattr(client, "close", None)
+    if close is not None:
+        close()
+
+
+# -------------------- ApiClient --------------------
+
+def bench_build_params(simulator: ApiSimulator) -> Dict:
+    client = make_client(simulator)
+    return measure(lambda: client._build_params(
+        EndpointType.USER_LOGIN, UserName=USER_NAME, UserPwd=PASSWORD,
+        Version=client.version, Mac=client.mac), number=20000)
+
+
+def bench_error_translation(simulator: ApiSimulator) -> Dict:
+    client = make_client(simulator)
+    if not hasattr(client, "_parse_response"):
+        raise Unsupported("ApiClient._parse_response")
+    params = client._build_params(EndpointType.USER_LOGIN)
+    return measure(lambda: client._parse_response("-82021", params), number=20000)
+
+
+def bench_send_request(simulator: ApiSimulator) -> Dict:
+    client = make_client(simulator)
+    params = client._build_params(EndpointType.GET_EXPIRY_TIME, UserName=USER_NAME, UserPwd=PASSWORD)
+    result = measure(lambda: client._send_request(params), number=200)
+    close_client(client)
+    return result
+
+
+# -------------------- 界面 --------------------
+
+def _qt_app():
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+def _wait_worker(app, window, tag):
+    """等待ApiWorker中该类别的调用结束，并派发结果回调；旧版本在界面线程中同步调用，无需等待"""
+    worker = getattr(window, "api_worker", None)
+    while worker is not None and worker.is_busy(tag):
+        worker.wait()
+        app.processEvents()
+
+
+def bench_login_sequence(simulator: ApiSimulator) -> Dict:
+    app = _qt_app()
+    LoginWindow = tested_module("login_window").LoginWindow
+    client = make_client(simulator)
+    window = LoginWindow(api_client=client, on_login_success=lambda info: None)
+    window.show_message = lambda title, message: None  # 跳过模态对话框
+    window.username_input.setText(USER_NAME)
+    window.password_input.setText(PASSWORD)
+
+    def login():
+        window.handle_username_login()
+        _wait_worker(app, window, 'login')
+
+    result = measure(login, number=20)
+    update_check_thread = getattr(window, "update_check_thread", None)
+    if update_check_thread is not None:
+        update_check_thread.wait()
+    window.deleteLater()
+    close_client(client)
+    return result
+
+
+def bench_update_user_info(simulator: ApiSimulator) -> Dict:
+    app = _qt_app()
+    MainWindow = tested_module("main_window").MainWindow
+    client = make_client(simulator)
+    login_info = {"username": USER_NAME, "password": PASSWORD, "token": "", "login_type": "password"}
+    window = MainWindow(login_info=login_info, functions=[], param_definitions=None, api_client=client)
+
+    def update():
+        window.update_user_info()
+        _wait_worker(app, window, 'user_info')
+
+    result = measure(update, number=50)
+    window.stop_status_check()
+    window.deleteLater()
+    close_client(client)
+    return result
+
+
+def _function_runner():
+    try:
+        return tested_module("function_runner").FunctionRunner
+    except Unsupported:
+        # 旧版本定义在main_window中
+        return tested_module("main_window").FunctionRunner
+
+
+def bench_function_runner_step(simulator: ApiSimulator) -> Dict:
+    _qt_app()
+    FunctionRunner = _function_runner()
+    steps = 1000
+    functions = [lambda *params: ("", 1)] * steps
+
+    def run_pipeline():
+        FunctionRunner(functions, loop=False).run()
+
+    result = measure(run_pipeline, number=5)
+    # 换算为每一步的循环开销
+    for key in ("median_us", "min_us", "mean_us"):
+        result[key] /= steps
+    return result
+
+
+def bench_function_runner_resume(simulator: ApiSimulator) -> Dict:
+    """暂停中的FunctionRunner从resume()到下一步开始执行的延迟"""
+    _qt_app()
+    FunctionRunner = _function_runner()
+    started = threading.Event()
+
+    def step(*params):
+        runner.pause()  # 每一步结束后都回到暂停状态
+        started.set()
+        return ("",)
+
+    runner = FunctionRunner([step], loop=True)
+    runner.pause()
+    runner.start()
+
+    def resume_once():
+        started.clear()
+        runner.resume()
+        started.wait()
+
+    result = measure(resume_once, number=20)
+    runner.stop()
+    runner.wait()
+    return result
+
+
+def bench_download_throughput(simulator: ApiSimulator) -> Dict:
+    _qt_app()
+    DownloadThread = tested_module("login_window").DownloadThread
+    size = 64 * 1024 * 1024
+    server = _serve_bytes(size)
+    url = f"http://127.0.0.1:{server.server_address[1]}/setup.exe"
+    with tempfile.TemporaryDirectory() as temp_dir:
+        save_path = os.path.join(temp_dir, "setup.exe")
+        result = measure(lambda: DownloadThread(url, save_path).run(), number=1, repeat=3)
+    server.shutdown()
+    result["mb_per_s"] = size / (result["median_us"] / 1e6) / (1024 * 1024)
+    return result
+
+
+def _serve_bytes(size: int) -> ThreadingHTTPServer:
+    """提供固定大小文件下载的本地HTTP服务，支持Range请求"""
+    payload = os.urandom(1024 * 1024) * (size // (1024 * 1024))
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            start, end = 0, len(payload) - 1
+            range_header = self.headers.get("Range")
+            if range_header and range_header.startswith("bytes="):
+                first, _, last = range_header[6:].partition("-")
+                start = int(first)
+                end = int(last) if last else end
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{len(payload)}")
+            else:
+                self.send_response(200)
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Content-Length", str(end - start + 1))
+            self.end_headers()
+            view = memoryview(payload)[start:end + 1]
+            for offset in range(0, len(view), 1024 * 1024):
+                self.wfile.write(view[offset:offset + 1024 * 1024])
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+BENCHMARKS = {
+    "api.build_params": bench_build_params,
+    "api.error_translation": bench_error_translation,
+    "api.send_request": bench_send_request,
+    "gui.login_sequence": bench_login_sequence,
+    "gui.update_user_info": bench_update_user_info,
+    "gui.function_runner_step": bench_function_runner_step,
+    "gui.function_runner_resume": bench_function_runner_resume,
+    "gui.download_throughput": bench_download_throughput,
+}
+
+
+def run(names: List[str]) -> Dict:
+    backend = SimulatedBackend(status_interval=0)
+    backend.seed(users=1, cards=1)
+    results = {}
+    cwd = os.getcwd()
+    with ApiSimulator(backend) as simulator, tempfile.TemporaryDirectory() as work_dir:
+        # 登录窗口会在当前目录写入login_info.json，切换到临时目录避免污染
+        os.chdir(work_dir)
+        try:
+            for name in names:
+                try:
+                    results[name] = BENCHMARKS[name](simulator)
+                    print(f"{name:32s} {results[name]['median_us']:12.2f} us")
+                except ImportError as e:
+                    print(f"{name:32s} 跳过（缺少依赖: {e}）")
+                except Unsupported as e:
+                    print(f"{name:32s} 跳过（被测代码不支持: {e}）")
+        finally:
+            os.chdir(cwd)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "src": SRC_DIR
+        },
+        "results": results
+    }
+
+
+def compare(baseline_path: str, current_path: str, threshold: float) -> int:
+    """对比两次结果，返回发生回退的基准数量"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    with open(current_path, encoding="utf-8") as f:
+        current = json.load(f)["results"]
+    regressions = 0
+    for name in sorted(set(baseline) & set(current)):
+        before = baseline[name]["median_us"]
+        after = current[name]["median_us"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  <-- 回退"
+            regressions += 1
+        print(f"{name:32s} {before:12.2f} -> {after:12.2f} us  {change:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ApiClient及界面热点路径的微基准测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="运行基准并保存结果")
+    run_parser.add_argument("--output", help="结果JSON路径")
+    run_parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="只运行指定基准")
+    compare_parser = subparsers.add_parser("compare", help="对比两次结果")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="允许的中位耗时增长比例")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = run(args.only or list(BENCHMARKS))
+        if args.output:
+            os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            print(f"结果已保存到 {args.output}")
+    else:
+        regressions = compare(args.baseline, args.current, args.threshold)
+        if regressions:
+            print(f"发现 {regressions} 项性能回退")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,17 @@
+import threading
+import time
 import requests
-from typing import Dict, Optional, Union
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Union
 from enum import Enum
+from api_errors import ApiResult, ErrorClass, classify_error_code, classify_http_status
+from api_metrics import ApiMetrics, outcome_of
+from endpoint_router import EndpointRouter
+from rate_governor import RateGovernor
+from response_cache import ResponseCache
+from retry_policy import RetryBudget, RetryPolicy
+from single_flight import SingleFlight
 
 class EndpointType(Enum):
     """接口类型枚举"""
@@ -31,18 +42,135 @@ class EndpointType(Enum):
     DEDUCT_POINTS = 26
     GET_VERSION_DATA = 27
 
+# 允许对冲请求的幂等接口，扣点、充值、注册等有副作用的接口绝不对冲；
+# 状态检测受服务端3分钟间隔限制（-81040），重复发送会消耗用户的检测次数，也不对冲
+HEDGEABLE_ENDPOINTS = frozenset({
+    EndpointType.GET_ANNOUNCEMENT,
+    EndpointType.GET_LATEST_VERSION,
+    EndpointType.GET_EXPIRY_TIME,
+    EndpointType.GET_REMAINING_POINTS,
+})
+_HEDGEABLE_TYPES = frozenset(endpoint.value for endpoint in HEDGEABLE_ENDPOINTS)
+
+# 只读接口：相同参数的并发调用合并为一次请求
+READ_ONLY_ENDPOINTS = frozenset({
+    EndpointType.GET_ANNOUNCEMENT,
+    EndpointType.GET_CORE_DATA,
+    EndpointType.GET_LATEST_VERSION,
+    EndpointType.GET_VMP_AUTH,
+    EndpointType.GET_PURCHASE_LINK,
+    EndpointType.GET_DOWNLOAD_URL,
+    EndpointType.GET_VARIABLE_DATA,
+    EndpointType.CHECK_USER_STATUS,
+    EndpointType.GET_SPECIFIC_DATA,
+    EndpointType.GET_USER_DETAILS,
+    EndpointType.GET_RECHARGE_INFO,
+    EndpointType.GET_EXPIRY_TIME,
+    EndpointType.GET_REMAINING_POINTS,
+    EndpointType.GET_VERSION_DATA,
+})
+_READ_ONLY_TYPES = frozenset(endpoint.value for endpoint in READ_ONLY_ENDPOINTS)
+
+# 各接口响应缓存有效期（秒），用户相关接口按用户名和密码分别缓存
+CACHE_TTLS = {
+    EndpointType.GET_ANNOUNCEMENT: 300,
+    EndpointType.GET_LATEST_VERSION: 600,
+    EndpointType.GET_DOWNLOAD_URL: 600,
+    EndpointType.GET_PURCHASE_LINK: 3600,
+    EndpointType.GET_VARIABLE_DATA: 300,
+    EndpointType.GET_EXPIRY_TIME: 30,
+    EndpointType.GET_REMAINING_POINTS: 15,
+    EndpointType.GET_USER_DETAILS: 15,
+}
+
+# 各接口限额：(容量, 周期秒数)，未列出的接口使用DEFAULT_RATE_LIMIT
+RATE_LIMITS = {
+    EndpointType.CHECK_USER_STATUS: (1, 180),  # 服务端要求状态检测间隔≥3分钟（-81040）
+    EndpointType.USER_LOGIN: (5, 60),
+    EndpointType.SINGLE_CODE_LOGIN: (5, 60),
+    EndpointType.USER_REGISTER: (3, 600),
+    EndpointType.USER_RECHARGE: (5, 60),
+    EndpointType.TRIAL_SOFTWARE: (3, 600),
+    EndpointType.GET_ANNOUNCEMENT: (10, 60),
+    EndpointType.DEDUCT_POINTS: (30, 60),
+}
+DEFAULT_RATE_LIMIT = (20, 60)
+IP_RATE_LIMIT = (60, 60)  # 同一IP所有接口合计（-81016）
+
+# 频率类错误码的冷却策略：错误码 -> (冷却的接口, 冷却秒数)，接口为None表示全局冷却
+RATE_PENALTIES = {
+    "-81015": (None, 600),  # 操作过于频繁，服务端锁定10分钟
+    "-81016": (None, 600),  # 同一IP访问次数过多
+    "-81040": (EndpointType.CHECK_USER_STATUS, 180),  # 状态检测间隔不足3分钟
+}
+
+# 登录类接口：登录成功后服务端会重新计算状态检测间隔
+_LOGIN_TYPES = frozenset({EndpointType.USER_LOGIN.value, EndpointType.SINGLE_CODE_LOGIN.value})
+
+# 会改变用户数据的接口，调用后清除该用户的缓存
+CACHE_INVALIDATING_ENDPOINTS = frozenset({
+    EndpointType.USER_RECHARGE,
+    EndpointType.DEDUCT_POINTS,
+})
+_INVALIDATING_TYPES = frozenset(endpoint.value for endpoint in CACHE_INVALIDATING_ENDPOINTS)
+
+class CallResult(NamedTuple):
+    """批量调用中单个接口的结果"""
+    success: bool
+    payload: str
+    latency: float  # 调用耗时（秒）
+
+
 class ApiClient:
     """文心云WebAPI完整封装"""
     
-    def __init__(self, soft_id: str, version: str, mac: str):
+    def __init__(self, soft_id: str, version: str, mac: str,
+                 base_urls: Optional[List[str]] = None, pool_connections: int = 1, pool_maxsize: int = 10,
+                 hedge: bool = False, hedge_percentile: float = 0.9,
+                 hedge_min_delay: float = 0.05, max_workers: int = 4,
+                 cache_ttls: Optional[Dict[EndpointType, float]] = None, cache_size: int = 256,
+                 rate_limit: bool = True, rate_max_wait: float = 3.0,
+                 retry_policy: Optional[RetryPolicy] = None):
         self.soft_id = soft_id
         self.version = version
         self.mac = mac
-        self.base_urls = [
+        self.base_urls = list(base_urls or [
             "http://api.1wxyun.com/",
             "http://api2.1wxyun.com/"
-        ]
+        ])
         self.timeout = 2
+        # 连接池配置：每个接口地址一个长连接会话，登录窗口、主窗口和工作线程共用
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self._sessions: Dict[str, requests.Session] = {}
+        self._session_lock = threading.Lock()
+        # 地址路由：粘滞选择最健康的地址，故障地址熔断后由后台探测恢复
+        self.router = EndpointRouter(self.base_urls, probe=self._probe_host)
+        # 对冲请求：主地址超过观测延迟分位数仍未响应时，向备用地址发送同一请求
+        self.hedge_enabled = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        # 批量调用的有界线程池
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pool_thread = threading.local()  # 批量调用线程池中的线程置位active
+        # 响应缓存：传入空字典可关闭缓存
+        self.cache_ttls = dict(CACHE_TTLS if cache_ttls is None else cache_ttls)
+        self.cache = ResponseCache(max_entries=cache_size)
+        # 只读接口的并发请求合并
+        self._inflight = SingleFlight()
+        # 客户端限流：在触发服务端-81015/-81016/-81040之前排队或拒绝
+        self.governor = RateGovernor(
+            RATE_LIMITS, default_limit=DEFAULT_RATE_LIMIT,
+            global_limit=IP_RATE_LIMIT, max_wait=rate_max_wait
+        ) if rate_limit else None
+        # 重试策略：只读接口遇到网络类错误时指数退避重试，重试预算整个客户端共享
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.retry_budget = RetryBudget()
+        # 调用指标：延迟直方图、错误码分布、故障切换/超时/重试次数
+        self.metrics = ApiMetrics()
+        self.metrics.add_collector(self._extra_metrics)
         self.error_codes = {
                             # 基础服务错误
                             "-81001": "接口不存在，请检查接口地址是否正确",
@@ -160,34 +288,310 @@ class ApiClient:
         params.update({k: v for k, v in kwargs.items() if v is not None})
         return params
 
+    def _get_session(self, base_url: str) -> requests.Session:
+        """获取指定接口地址的长连接会话（线程安全，首次使用时创建）"""
+        session = self._sessions.get(base_url)
+        if session is not None:
+            return session
+        with self._session_lock:
+            session = self._sessions.get(base_url)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=self.pool_connections,
+                    pool_maxsize=self.pool_maxsize
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers["Connection"] = "keep-alive"
+                self._sessions[base_url] = session
+        return session
+
+    def close(self):
+        """关闭所有长连接会话，释放连接池"""
+        with self._session_lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+            self._hedge_executor = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def call_many(self, calls: Sequence) -> List[CallResult]:
+        """
+        并发执行多个接口调用，按传入顺序返回结果
+        :param calls: 调用列表，每项为 方法名/方法 或 (方法名/方法, 参数)，
+                      参数为元组时按位置传递，为字典时按关键字传递，例如：
+                      [("get_expiry_time", (user, pwd)), "get_announcement"]
+        :return: CallResult列表，包含是否成功、响应内容和耗时
+        """
+        resolved = [self._resolve_call(call) for call in calls]
+        if getattr(self._pool_thread, "active", False):
+            # 嵌套调用（例如预取中的用户信息再分别获取）：已占用工作线程时依次执行，
+            # 否则外层任务等待的子任务可能因没有空闲工作线程而永远无法执行
+            return [self._timed_call(*call) for call in resolved]
+        if self._executor is None:
+            with self._session_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="api-call",
+                        initializer=self._mark_pool_thread)
+        futures = [self._executor.submit(self._timed_call, *call) for call in resolved]
+        return [future.result() for future in futures]
+
+    def _mark_pool_thread(self):
+        self._pool_thread.active = True
+
+    def _resolve_call(self, call) -> tuple:
+        """将调用描述解析为 (方法, 位置参数, 关键字参数)"""
+        if not isinstance(call, (tuple, list)):
+            call = (call,)
+        method = call[0]
+        if isinstance(method, str):
+            method = getattr(self, method)
+        args = call[1] if len(call) > 1 else ()
+        if isinstance(args, dict):
+            return method, (), args
+        return method, tuple(args), {}
+
+    @staticmethod
+    def _timed_call(method: Callable, args: tuple, kwargs: Dict) -> CallResult:
+        start_time = time.monotonic()
+        try:
+            success, payload = method(*args, **kwargs)
+        except Exception as e:
+            success, payload = False, f"调用异常: {str(e)}"
+        return CallResult(success, payload, time.monotonic() - start_time)
+
+    def _probe_host(self, base_url: str) -> bool:
+        """探测接口地址是否可用：与正式请求的判断一致，只有2xx响应算可用，5xx等仍视为故障"""
+        try:
+            return self._get_session(base_url).get(base_url, timeout=self.timeout).ok
+        except requests.RequestException:
+            return False
+
     def _send_request(self, params: Dict) -> Union[str, Dict]:
         """
         发送请求，严格遵循文档规范
         :param params: 请求参数字典，必须包含type参数
-        :return: 响应数据或错误信息
+        :return: ApiResult，可按 (是否成功, 响应内容或错误信息) 解包
         """
         endpoint_type = params.get("type")  # 获取接口类型
         if not endpoint_type:
             return "请求参数错误：缺少type参数"
 
-        for url in self.base_urls:
+        request_key = self._request_key(params)
+        ttl, cached = self._cache_lookup(params, request_key)
+        if cached is not None:
+            return cached
+        if endpoint_type in _READ_ONLY_TYPES:
+            return self._inflight.do(request_key, lambda: self._fetch(params, request_key, ttl))
+        return self._fetch(params, request_key, ttl)
+
+    def _fetch(self, params: Dict, request_key: tuple, ttl: Optional[float]) -> ApiResult:
+        """发送请求并按重试策略重试，成功结果写入缓存"""
+        endpoint_type = EndpointType(params["type"])
+        # 每次逻辑调用只占用一次限流许可，重试不再申请，否则首次网络失败会被本地判为过频
+        if self.governor is not None:
+            wait = self.governor.acquire(endpoint_type)
+            if wait:
+                return self._throttled_result(params, wait)
+        deadline = time.monotonic() + self.retry_policy.deadline
+        self.retry_budget.deposit()
+        attempt = 1
+        reached_server = False
+        while True:
+            result = self._dispatch(params, deadline)
+            reached_server = reached_server or not result.host_failed
+            delay = self._retry_delay(params, result, attempt, deadline)
+            if delay is None:
+                break
+            self.metrics.record_retry(endpoint_type.name)
+            time.sleep(delay)
+            attempt += 1
+        if self.governor is not None and not reached_server:
+            # 所有尝试都因地址故障失败，服务端未计入本次调用，归还许可
+            self.governor.refund(endpoint_type)
+        self._finish(params, request_key, ttl, result)
+        return result
+
+    def _finish(self, params: Dict, request_key: tuple, ttl: Optional[float], result: ApiResult):
+        """请求完成后的处理：写入缓存，频率类错误码施加冷却，登录成功后重置状态检测的限流"""
+        self._cache_store(params, request_key, ttl, result)
+        # 只按最终采用的结果施加冷却，对冲中落后请求的响应不影响限流
+        penalty = RATE_PENALTIES.get(str(result.code)) if result.code is not None else None
+        if penalty is not None and self.governor is not None:
+            self.governor.penalize(*penalty)
+        if result.success and self.governor is not None and params["type"] in _LOGIN_TYPES:
+            self.governor.reset(EndpointType.CHECK_USER_STATUS)
+
+    def _retry_delay(self, params: Dict, result: ApiResult, attempt: int, deadline: float) -> Optional[float]:
+        """
+        判断失败的调用是否应重试：仅重试只读接口的可重试错误，且受次数、总时限和重试预算限制
+        :return: 重试前的等待秒数，不重试返回None
+        """
+        if result.success or not result.retryable or params["type"] not in _READ_ONLY_TYPES:
+            return None
+        if attempt >= self.retry_policy.max_attempts:
+            return None
+        delay = self.retry_policy.backoff(attempt)
+        if time.monotonic() + delay >= deadline or not self.retry_budget.withdraw():
+            return None
+        return delay
+
+    def _dispatch(self, params: Dict, deadline: float) -> ApiResult:
+        """按地址路由发送请求，必要时对冲或切换备用地址"""
+        endpoint_type = params["type"]
+        urls = self.router.ordered_urls()
+        result = None
+        if self.hedge_enabled and len(urls) > 1 and endpoint_type in _HEDGEABLE_TYPES:
+            result = self._send_hedged(urls[0], urls[1], params, deadline)
+            if not result.host_failed:
+                return result
+        else:
+            for index, url in enumerate(urls):
+                timeout = min(self.timeout, deadline - time.monotonic())
+                if timeout <= 0:
+                    break
+                if index:
+                    self.metrics.record_failover(EndpointType(endpoint_type).name)
+                result = self._post_once(url, params, timeout)
+                if not result.host_failed:
+                    return result
+        error_class = result.error_class if result is not None else ErrorClass.UNAVAILABLE
+        return ApiResult(False, "接口调用失效", error_class=error_class)
+
+    @staticmethod
+    def _request_key(params: Dict) -> tuple:
+        """由请求参数生成的唯一键，用于缓存和并发合并"""
+        return tuple(sorted((k, str(v)) for k, v in params.items()))
+
+    def _cache_lookup(self, params: Dict, request_key: tuple) -> tuple:
+        """
+        查询响应缓存
+        :return: (有效期, 缓存结果)，不可缓存的接口有效期为None
+        """
+        ttl = self.cache_ttls.get(EndpointType(params["type"]))
+        if not ttl:
+            return None, None
+        return ttl, self.cache.get(request_key)
+
+    def _cache_store(self, params: Dict, request_key: tuple, ttl: Optional[float], result: tuple):
+        """缓存成功的响应；充值、扣点后清除该用户的缓存"""
+        if ttl and result[0]:
+            self.cache.put(request_key, result, ttl)
+        if params["type"] in _INVALIDATING_TYPES and "UserName" in params:
+            user_item = ("UserName", str(params["UserName"]))
+            self.cache.invalidate(lambda key: user_item in key)
+
+    def get_cache_stats(self) -> Dict[str, int]:
+        """返回响应缓存的命中、未命中、淘汰次数及条目数"""
+        return self.cache.stats()
+
+    def _throttled_result(self, params: Dict, wait: float) -> ApiResult:
+        """本地限流拒绝时的结果"""
+        result = ApiResult(False, f"请求过于频繁，请{int(wait) + 1}秒后再试",
+                           error_class=ErrorClass.THROTTLED)
+        self.metrics.record_outcome(EndpointType(params["type"]).name, "local_throttled")
+        return result
+
+    def get_metrics(self) -> Dict:
+        """返回调用指标快照，另含各地址健康状态、缓存和并发合并统计"""
+        snapshot = self.metrics.snapshot()
+        snapshot["router"] = self.router.get_health()
+        return snapshot
+
+    def _extra_metrics(self) -> Dict[str, float]:
+        cache_stats = self.cache.stats()
+        return {
+            "api_cache_hits_total": cache_stats["hits"],
+            "api_cache_misses_total": cache_stats["misses"],
+            "api_cache_evictions_total": cache_stats["evictions"],
+            "api_coalesced_total": self._inflight.shared
+        }
+
+    def _parse_response(self, text: str, params: Dict) -> ApiResult:
+        """解析响应文本，错误码转换为对应的错误信息和错误分类"""
+        response_text = text.strip()
+        # 判断是否为错误码
+        if response_text.startswith("-"):
+            message = self.error_codes.get(response_text, f"未知错误码: {response_text}")
             try:
-                # 构建符合文档规范的URL
-                full_url = f"{url}?type={endpoint_type}"
-                # 发送POST请求，确保参数以表单形式提交
-                response = requests.post(full_url, data=params, timeout=self.timeout)
-                
-                if response.ok:
-                    response_text = response.text.strip()
-                    # 判断是否为错误码
-                    if response_text.startswith("-"):
-                        return False, self.error_codes.get(response_text, f"未知错误码: {response_text}")
-                    else:
-                        return True, response_text  # 返回成功响应
-            except (requests.Timeout, requests.ConnectionError) as e:
-                print(f"请求失败，切换备用地址: {e}")
-                continue  # 切换备用地址
-        return False, "接口调用失效"
+                code = int(response_text)
+            except ValueError:
+                return ApiResult(False, message)
+            return ApiResult(False, message, code, classify_error_code(code))
+        return ApiResult(True, response_text)  # 返回成功响应
+
+    def _post_once(self, url: str, params: Dict, timeout: Optional[float] = None) -> ApiResult:
+        """
+        向单个地址发送一次请求
+        :return: 调用结果，地址不可用时错误分类为UNAVAILABLE以便切换备用地址
+        """
+        start_time = time.monotonic()
+        try:
+            # 构建符合文档规范的URL
+            full_url = f"{url}?type={params['type']}"
+            # 发送POST请求，确保参数以表单形式提交
+            response = self._get_session(url).post(full_url, data=params, timeout=timeout or self.timeout)
+
+            latency = time.monotonic() - start_time
+            if response.ok:
+                self.router.record_success(url, latency)
+                result = self._parse_response(response.text, params)
+            else:
+                self.router.record_failure(url, latency)
+                print(f"服务器响应异常 HTTP {response.status_code}，切换备用地址")
+                result = ApiResult(False, f"服务器响应异常: HTTP {response.status_code}",
+                                   error_class=classify_http_status(response.status_code))
+            outcome = outcome_of(result)
+        except requests.RequestException as e:
+            # 包括连接失败、超时和响应体不完整（ChunkedEncodingError等），都按地址故障处理
+            latency = time.monotonic() - start_time
+            self.router.record_failure(url, latency)
+            print(f"请求失败，切换备用地址: {e}")
+            result = ApiResult(False, f"网络请求失败: {str(e)}", error_class=ErrorClass.UNAVAILABLE)
+            outcome = "timeout" if isinstance(e, requests.Timeout) else outcome_of(result)
+            if outcome == "timeout":
+                self.metrics.record_timeout(url)
+        self.metrics.record_request(EndpointType(params["type"]).name, url, latency, outcome)
+        return result
+
+    def _send_hedged(self, primary: str, secondary: str, params: Dict, deadline: float) -> ApiResult:
+        """对冲请求：主地址迟迟未响应或失败时向备用地址补发，返回先到的有效响应"""
+        if self._hedge_executor is None:
+            with self._session_lock:
+                if self._hedge_executor is None:
+                    self._hedge_executor = ThreadPoolExecutor(
+                        max_workers=self.pool_maxsize, thread_name_prefix="api-hedge")
+        timeout = max(min(self.timeout, deadline - time.monotonic()), 0.001)
+        delay = self.router.latency_percentile(primary, self.hedge_percentile)
+        if delay is None:
+            delay = timeout / 2
+        delay = min(max(delay, self.hedge_min_delay), timeout)
+
+        pending = {self._hedge_executor.submit(self._post_once, primary, params, timeout)}
+        done, pending = wait(pending, timeout=delay)
+        hedged = False
+        while True:
+            for future in done:
+                result = future.result()
+                if not result.host_failed:
+                    # 取消尚未开始的落后请求，已发出的请求结果直接丢弃
+                    for loser in pending:
+                        loser.cancel()
+                    return result
+            if not hedged:
+                hedged = True
+                self.metrics.record_hedge(EndpointType(params["type"]).name)
+                pending.add(self._hedge_executor.submit(self._post_once, secondary, params, timeout))
+            if not pending:
+                return result
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
 
     # -------------------- 完整接口实现 --------------------
     
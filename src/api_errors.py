@@ -0,0 +1,93 @@
+from enum import Enum
+from typing import Optional
+
+
+class ErrorClass(Enum):
+    """错误分类，决定调用失败后是否可以重试"""
+    NONE = "none"                # 调用成功
+    UNAVAILABLE = "unavailable"  # 网络异常、超时、HTTP 5xx，可切换地址或重试
+    THROTTLED = "throttled"      # 访问过频或被临时锁定，需冷却后再试，不应立即重试
+    AUTH = "auth"                # 登录状态失效，需要重新登录
+    PERMANENT = "permanent"      # 参数、账户、卡密等业务错误，重试无意义
+
+    @property
+    def retryable(self) -> bool:
+        return self is ErrorClass.UNAVAILABLE
+
+
+# 需要冷却后再试的错误码
+THROTTLED_CODES = frozenset({
+    -81015,  # 操作过于频繁
+    -81016,  # 同一IP访问次数过多
+    -81028,  # 账号在其他设备登录，10分钟后再试
+    -81029,  # 账号在异地IP登录，10分钟后再试
+    -81040,  # 状态检测过于频繁
+})
+
+# 登录状态失效的错误码
+AUTH_CODES = frozenset({
+    -81023,  # 请先登录或账号已被强制下线
+    -81030,  # 超过同时登录数量限制
+    -81031,  # 账号已在其他设备登录
+    -81032,  # Token格式错误
+})
+
+
+def classify_error_code(code: int) -> ErrorClass:
+    """根据服务端错误码判断错误分类"""
+    if code in THROTTLED_CODES:
+        return ErrorClass.THROTTLED
+    if code in AUTH_CODES:
+        return ErrorClass.AUTH
+    return ErrorClass.PERMANENT
+
+
+def classify_http_status(status: int) -> ErrorClass:
+    """根据HTTP状态码判断错误分类"""
+    if status >= 500 or status == 429:
+        return ErrorClass.UNAVAILABLE
+    return ErrorClass.PERMANENT
+
+
+class ApiResult(tuple):
+    """
+    接口调用结果
+
+    仍可按 (是否成功, 响应内容) 解包，与原有调用方式兼容，
+    另外携带服务端错误码（数字）和错误分类：
+
+        result = api_client.get_expiry_time(user, pwd)
+        success, payload = result
+        if not success and result.error_class is ErrorClass.AUTH:
+            ...
+    """
+
+    def __new__(cls, success: bool, payload: str, code: Optional[int] = None,
+                error_class: Optional[ErrorClass] = None):
+        result = super().__new__(cls, (success, payload))
+        result.code = code
+        if error_class is None:
+            error_class = ErrorClass.NONE if success else ErrorClass.PERMANENT
+        result.error_class = error_class
+        return result
+
+    @property
+    def success(self) -> bool:
+        return self[0]
+
+    @property
+    def payload(self) -> str:
+        return self[1]
+
+    @property
+    def retryable(self) -> bool:
+        return self.error_class.retryable
+
+    @property
+    def host_failed(self) -> bool:
+        """失败且没有服务端错误码，说明是地址本身的问题（网络或HTTP错误），应切换备用地址"""
+        return not self[0] and self.code is None
+
+    def __repr__(self):
+        return (f"ApiResult(success={self[0]!r}, payload={self[1]!r}, "
+                f"code={self.code!r}, error_class={self.error_class.value})")
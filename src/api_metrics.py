@@ -0,0 +1,183 @@
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+# 延迟直方图的桶上界（秒），最后一个桶为+Inf
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0)
+
+
+def outcome_of(result) -> str:
+    """结果标签：成功为ok，服务端错误为错误码，其他为错误分类"""
+    if result[0]:
+        return "ok"
+    if result.code is not None:
+        return str(result.code)
+    return result.error_class.value
+
+
+class LatencyHistogram:
+    """固定分桶的延迟直方图，记录只需一次二分查找和一次数组自增"""
+
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self):
+        self.counts = array("L", [0] * (len(LATENCY_BUCKETS) + 1))
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        """按桶上界估算分位数，落在+Inf桶时返回最大有限上界"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return LATENCY_BUCKETS[min(index, len(LATENCY_BUCKETS) - 1)]
+        return LATENCY_BUCKETS[-1]
+
+    def snapshot(self) -> Dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "buckets": dict(zip([*map(str, LATENCY_BUCKETS), "+Inf"], self.counts)),
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99)
+        }
+
+
+class ApiMetrics:
+    """接口调用指标：按接口和地址统计延迟直方图，按错误码统计结果，以及故障切换、超时、重试次数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoint_latency: Dict[str, LatencyHistogram] = {}
+        self._host_latency: Dict[str, LatencyHistogram] = {}
+        self._responses = Counter()  # (接口, 结果) -> 次数，结果为ok、错误码或错误分类
+        self._failovers = Counter()  # 接口 -> 次数
+        self._timeouts = Counter()   # 地址 -> 次数
+        self._retries = Counter()    # 接口 -> 次数
+        self._hedges = Counter()     # 接口 -> 次数
+        self._collectors: List[Callable[[], Dict[str, float]]] = []
+
+    def record_request(self, endpoint: str, host: str, latency: float, outcome: str):
+        """记录一次发往单个地址的请求"""
+        with self._lock:
+            histogram = self._endpoint_latency.get(endpoint)
+            if histogram is None:
+                histogram = self._endpoint_latency[endpoint] = LatencyHistogram()
+            histogram.record(latency)
+            histogram = self._host_latency.get(host)
+            if histogram is None:
+                histogram = self._host_latency[host] = LatencyHistogram()
+            histogram.record(latency)
+            self._responses[(endpoint, outcome)] += 1
+
+    def record_outcome(self, endpoint: str, outcome: str):
+        """记录未发出网络请求的结果，例如本地限流拒绝"""
+        with self._lock:
+            self._responses[(endpoint, outcome)] += 1
+
+    def record_failover(self, endpoint: str):
+        with self._lock:
+            self._failovers[endpoint] += 1
+
+    def record_timeout(self, host: str):
+        with self._lock:
+            self._timeouts[host] += 1
+
+    def record_retry(self, endpoint: str):
+        with self._lock:
+            self._retries[endpoint] += 1
+
+    def record_hedge(self, endpoint: str):
+        with self._lock:
+            self._hedges[endpoint] += 1
+
+    def add_collector(self, collector: Callable[[], Dict[str, float]]):
+        """注册额外指标来源，返回 指标名 -> 数值，导出时一并输出"""
+        self._collectors.append(collector)
+
+    def snapshot(self) -> Dict:
+        """返回所有指标的快照"""
+        with self._lock:
+            snapshot = {
+                "endpoints": {name: h.snapshot() for name, h in self._endpoint_latency.items()},
+                "hosts": {host: h.snapshot() for host, h in self._host_latency.items()},
+                "responses": {f"{endpoint}:{outcome}": count
+                              for (endpoint, outcome), count in self._responses.items()},
+                "failovers": dict(self._failovers),
+                "timeouts": dict(self._timeouts),
+                "retries": dict(self._retries),
+                "hedges": dict(self._hedges)
+            }
+        for collector in self._collectors:
+            snapshot.update(collector())
+        return snapshot
+
+    def to_prometheus(self) -> str:
+        """导出为Prometheus文本格式"""
+        lines = []
+        with self._lock:
+            for metric, label, histograms in (
+                    ("api_request_duration_seconds", "endpoint", self._endpoint_latency),
+                    ("api_host_request_duration_seconds", "host", self._host_latency)):
+                lines.append(f"# TYPE {metric} histogram")
+                for name, histogram in histograms.items():
+                    cumulative = 0
+                    for bound, bucket_count in zip([*map(str, LATENCY_BUCKETS), "+Inf"], histogram.counts):
+                        cumulative += bucket_count
+                        lines.append(f'{metric}_bucket{{{label}="{name}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_sum{{{label}="{name}"}} {histogram.total}')
+                    lines.append(f'{metric}_count{{{label}="{name}"}} {histogram.count}')
+            lines.append("# TYPE api_responses_total counter")
+            for (endpoint, outcome), count in self._responses.items():
+                lines.append(f'api_responses_total{{endpoint="{endpoint}",result="{outcome}"}} {count}')
+            for metric, label, counter in (
+                    ("api_failovers_total", "endpoint", self._failovers),
+                    ("api_timeouts_total", "host", self._timeouts),
+                    ("api_retries_total", "endpoint", self._retries),
+                    ("api_hedges_total", "endpoint", self._hedges)):
+                lines.append(f"# TYPE {metric} counter")
+                for name, count in counter.items():
+                    lines.append(f'{metric}{{{label}="{name}"}} {count}')
+        for collector in self._collectors:
+            for name, value in collector().items():
+                if isinstance(value, (int, float)):
+                    lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """将Prometheus文本写入文件，可配合node_exporter的textfile采集"""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+
+    def serve_prometheus(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """在本地端口提供 /metrics，返回服务对象，调用其shutdown()停止"""
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
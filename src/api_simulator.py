@@ -0,0 +1,540 @@
+"""
+文心云WebAPI本地模拟服务
+
+与ApiClient使用相同的表单POST `?type=N` 协议，在内存中维护用户、卡密、点数、到期时间和变量，
+支持按接口配置延迟分布、按概率注入错误码，以及让主地址下线以验证故障切换。
+
+命令行启动：
+    python src/api_simulator.py --port 8081 --users 100 --latency 30 --inject -81015:0.01
+
+代码中使用：
+    with ApiSimulator() as sim:
+        client = ApiClient(soft_id, version, mac, base_urls=sim.base_urls)
+        sim.set_primary_down("refuse")
+"""
+import argparse
+import json
+import random
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from api_client import EndpointType
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class LatencyModel:
+    """延迟分布：基础延迟加均匀抖动，并以一定概率出现长尾延迟（毫秒）"""
+
+    def __init__(self, base_ms: float = 0, jitter_ms: float = 0,
+                 tail_probability: float = 0, tail_ms: float = 0):
+        self.base_ms = base_ms
+        self.jitter_ms = jitter_ms
+        self.tail_probability = tail_probability
+        self.tail_ms = tail_ms
+
+    def sample(self) -> float:
+        """返回一次请求的延迟（秒）"""
+        delay = self.base_ms + random.uniform(0, self.jitter_ms)
+        if self.tail_probability and random.random() < self.tail_probability:
+            delay += self.tail_ms
+        return delay / 1000
+
+
+class SimulatedBackend:
+    """模拟服务端的业务状态（线程安全）"""
+
+    def __init__(self, status_interval: float = 180, billing: str = "time", trial_days: float = 1):
+        """
+        :param status_interval: 两次状态检测的最小间隔（秒），不足时返回-81040
+        :param billing: 收费模式，time为计时，points为计点
+        :param trial_days: 注册用户的试用天数，为0时注册后需充值才能登录
+        """
+        self.status_interval = status_interval
+        self.billing = billing
+        self.trial_days = trial_days
+        self.announcement = "欢迎使用本地模拟服务"
+        self.latest_version = "1.0"
+        self.download_url = "http://127.0.0.1/update/setup.exe"
+        self.purchase_link = "http://127.0.0.1/buy"
+        self.users: Dict[str, Dict] = {}
+        self.cards: Dict[str, Dict] = {}
+        self.variables: Dict[str, str] = {}
+        self.blacklist: Dict[str, str] = {}
+        self.latency: Dict[Optional[EndpointType], LatencyModel] = {None: LatencyModel()}
+        self.error_injection: Dict[Optional[EndpointType], List[Tuple[str, float]]] = {}
+        self.request_counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # -------------------- 数据准备 --------------------
+
+    def add_user(self, user_name: str, password: str, days: float = 30, points: int = 100,
+                 super_pwd: Optional[str] = None):
+        with self._lock:
+            self._new_user(user_name, password, days, points, super_pwd)
+
+    def _new_user(self, user_name: str, password: str, days: float, points: int,
+                  super_pwd: Optional[str]):
+        self.users[user_name] = {
+            "password": password,
+            "super_pwd": super_pwd or password,
+            "expiry": datetime.now() + timedelta(days=days),
+            "points": points,
+            "mac": "",
+            "token": None,
+            "last_status_check": 0.0,
+            "data": "",
+            "recharges": [],
+            "banned": False
+        }
+
+    def add_card(self, card: str, days: float = 30, points: int = 0):
+        """添加卡密，可用于充值或单码登录"""
+        with self._lock:
+            self.cards[card] = {"days": days, "points": points, "used_by": None, "data": "",
+                                "token": None, "expiry": None, "last_status_check": 0.0}
+
+    def seed(self, users: int = 10, cards: int = 10):
+        """批量生成测试用户 user000001/pass000001 及卡密"""
+        for i in range(1, users + 1):
+            self.add_user(f"user{i:06d}", f"pass{i:06d}")
+        for i in range(1, cards + 1):
+            self.add_card(f"CARD{i:012d}")
+        self.variables.update({"1": "变量一", "demo": "演示变量"})
+
+    # -------------------- 请求处理 --------------------
+
+    def handle(self, endpoint: EndpointType, form: Dict[str, str]) -> str:
+        """处理一次接口请求，返回响应文本"""
+        with self._lock:
+            self.request_counts[endpoint.name] = self.request_counts.get(endpoint.name, 0) + 1
+            injected = self._injected_error(endpoint)
+            if injected:
+                return injected
+            handler = getattr(self, f"_handle_{endpoint.name.lower()}", None)
+            if handler is None:
+                return "-81001"
+            return handler(form)
+
+    def latency_for(self, endpoint: Optional[EndpointType]) -> float:
+        model = self.latency.get(endpoint) or self.latency[None]
+        return model.sample()
+
+    def _injected_error(self, endpoint: EndpointType) -> Optional[str]:
+        for rules in (self.error_injection.get(endpoint, ()), self.error_injection.get(None, ())):
+            for code, probability in rules:
+                if random.random() < probability:
+                    return code
+        return None
+
+    def _auth_user(self, form: Dict[str, str]) -> Tuple[Optional[Dict], Optional[str]]:
+        """按用户名和Token校验登录状态"""
+        user = self.users.get(form.get("UserName", ""))
+        if user is None:
+            card = self.cards.get(form.get("UserName", ""))
+            if card is not None and card["token"] and card["token"] == form.get("Token"):
+                return card, None
+            return None, "-82001" if card is None else "-81023"
+        if not user["token"] or user["token"] != form.get("Token"):
+            return None, "-81023"
+        return user, None
+
+    def _check_password(self, form: Dict[str, str]) -> Tuple[Optional[Dict], Optional[str]]:
+        """按用户名和密码校验（密码可为空，与取到期时间等接口一致）"""
+        user = self.users.get(form.get("UserName", ""))
+        if user is None:
+            return None, "-82001"
+        if form.get("UserPwd") and form["UserPwd"] != user["password"]:
+            return None, "-82021"
+        return user, None
+
+    def _handle_get_announcement(self, form):
+        return self.announcement
+
+    def _handle_get_core_data(self, form):
+        user, error = self._auth_user(form)
+        return error or "core-data"
+
+    def _handle_get_latest_version(self, form):
+        return self.latest_version
+
+    def _handle_get_vmp_auth(self, form):
+        user, error = self._auth_user(form)
+        if error:
+            return error
+        vmp_mac = form.get("VmpMac", "")
+        if not 10 <= len(vmp_mac) <= 200:
+            return "-81047"
+        return f"vmp-{vmp_mac}"
+
+    def _handle_get_purchase_link(self, form):
+        return self.purchase_link
+
+    def _handle_get_download_url(self, form):
+        return self.download_url
+
+    def _handle_get_variable_data(self, form):
+        user, error = self._auth_user(form)
+        if error:
+            return error
+        for key in (form.get("VariableId"), form.get("VariableName")):
+            if key and key in self.variables:
+                return self.variables[key]
+        return "-81018"
+
+    def _handle_check_user_status(self, form):
+        user, error = self._auth_user(form)
+        if error:
+            return error
+        now = time.monotonic()
+        if user["last_status_check"] and now - user["last_status_check"] < self.status_interval:
+            return "-81040"
+        user["last_status_check"] = now
+        if user["expiry"] is not None and user["expiry"] < datetime.now():
+            return "-82007"
+        return "1"
+
+    def _handle_user_register(self, form):
+        user_name = form.get("UserName", "")
+        password = form.get("UserPwd", "")
+        if not (6 <= len(user_name) <= 16 and user_name.isalnum()):
+            return "-82002"
+        if not (6 <= len(password) <= 16 and password.isalnum()):
+            return "-82003"
+        if user_name in self.users:
+            return "-82005"
+        self._new_user(user_name, password, days=self.trial_days, points=0, super_pwd=form.get("SupPwd"))
+        return "1"
+
+    def _login(self, user: Dict, form: Dict[str, str]) -> str:
+        if form.get("Mac", "") in self.blacklist:
+            return "-81039"
+        if user["expiry"] is not None and user["expiry"] < datetime.now() and self.billing == "time":
+            return "-82007"
+        user["token"] = secrets.token_hex(8)
+        user["mac"] = form.get("Mac", "")
+        user["last_status_check"] = 0.0
+        return user["token"]
+
+    def _handle_user_login(self, form):
+        user = self.users.get(form.get("UserName", ""))
+        if user is None or user["password"] != form.get("UserPwd"):
+            return "-82021"
+        if user["banned"]:
+            return "-82006"
+        return self._login(user, form)
+
+    def _handle_user_recharge(self, form):
+        user = self.users.get(form.get("UserName", ""))
+        if user is None:
+            return "-82001"
+        card = self.cards.get(form.get("CardPwd", ""))
+        if card is None:
+            return "-84002"
+        if card["used_by"]:
+            return "-84003"
+        card["used_by"] = form["UserName"]
+        user["expiry"] = max(user["expiry"], datetime.now()) + timedelta(days=card["days"])
+        user["points"] += card["points"]
+        user["recharges"].append({"card": form["CardPwd"], "time": datetime.now().strftime(TIME_FORMAT)})
+        return "1"
+
+    def _handle_user_change_pwd(self, form):
+        user = self.users.get(form.get("UserName", ""))
+        if user is None:
+            return "-82001"
+        if user["super_pwd"] != form.get("SupPwd"):
+            return "-82018"
+        user["password"] = form.get("NewUserPwd", "")
+        return "1"
+
+    def _handle_user_rebind(self, form):
+        user, error = self._check_password(form)
+        if error:
+            return error
+        if form.get("Type") not in ("1", "2"):
+            return "-81035"
+        if form.get("Type") == "1":
+            if user["mac"] == form.get("Mac"):
+                return "-82015"
+            user["mac"] = form.get("Mac", "")
+        return "1"
+
+    def _handle_user_logout(self, form):
+        user, error = self._auth_user(form)
+        if error:
+            return error
+        user["token"] = None
+        return "1"
+
+    def _handle_trial_software(self, form):
+        return secrets.token_hex(8)
+
+    def _handle_single_code_login(self, form):
+        card = self.cards.get(form.get("Card", ""))
+        if card is None:
+            return "-83001"
+        if card["used_by"] and card["used_by"] != form.get("Card"):
+            return "-83018"
+        if card["expiry"] is None:
+            card["used_by"] = form["Card"]
+            card["expiry"] = datetime.now() + timedelta(days=card["days"])
+        if card["expiry"] < datetime.now():
+            return "-83006"
+        card["token"] = secrets.token_hex(8)
+        card["last_status_check"] = 0.0
+        return card["token"]
+
+    def _handle_ban_user(self, form):
+        user, error = self._check_password(form)
+        if error:
+            return error
+        user["banned"] = True
+        user["token"] = None
+        return "1"
+
+    def _handle_set_user_data(self, form):
+        user, error = self._auth_user(form)
+        if error:
+            return error
+        if len(form.get("Data", "")) > 4096:
+            return "-81042"
+        user["data"] = form.get("Data", "")
+        return "1"
+
+    def _handle_add_blacklist(self, form):
+        if len(form.get("Reason", "")) > 200:
+            return "-81044"
+        if form.get("Mac", "") in self.blacklist:
+            return "-81027"
+        self.blacklist[form.get("Mac", "")] = form.get("Reason", "")
+        return "1"
+
+    def _handle_get_specific_data(self, form):
+        user, error = self._auth_user(form)
+        if error:
+            return error
+        values = {
+            "1": user["expiry"].strftime(TIME_FORMAT) if user.get("expiry") else "",
+            "2": str(user.get("points", 0)),
+            "3": user.get("mac", ""),
+            "4": user.get("data", "")
+        }
+        return values.get(form.get("Type"), "-81049")
+
+    def _handle_get_user_details(self, form):
+        user, error = self._check_password(form)
+        if error:
+            return error
+        return json.dumps({
+            "UserName": form["UserName"],
+            "ExpireTime": user["expiry"].strftime(TIME_FORMAT),
+            "Point": user["points"],
+            "Mac": user["mac"],
+            "Data": user["data"]
+        }, ensure_ascii=False)
+
+    def _handle_get_recharge_info(self, form):
+        user, error = self._check_password(form)
+        if error:
+            return error
+        return json.dumps(user["recharges"], ensure_ascii=False)
+
+    def _handle_get_expiry_time(self, form):
+        user, error = self._check_password(form)
+        if error:
+            return error
+        return user["expiry"].strftime(TIME_FORMAT)
+
+    def _handle_get_remaining_points(self, form):
+        user, error = self._check_password(form)
+        if error:
+            return error
+        return str(user["points"])
+
+    def _handle_deduct_points(self, form):
+        user, error = self._auth_user(form)
+        if error:
+            return error
+        if self.billing != "points":
+            return "-81026"
+        try:
+            quantity = int(form.get("Quantity", "0"))
+        except ValueError:
+            return "-81024"
+        if quantity <= 0:
+            return "-81024"
+        if user["points"] < quantity:
+            return "-81036"
+        user["points"] -= quantity
+        return str(user["points"])
+
+    def _handle_get_version_data(self, form):
+        user, error = self._auth_user(form)
+        return error or "1"
+
+
+class ApiSimulator:
+    """在本地启动主、备两个地址的模拟服务，二者共享同一份业务状态"""
+
+    def __init__(self, backend: Optional[SimulatedBackend] = None, host: str = "127.0.0.1",
+                 primary_port: int = 0, secondary_port: int = 0):
+        self.backend = backend or SimulatedBackend()
+        self.primary_down: Optional[str] = None  # None、refuse、hang或error
+        self.hang_seconds = 30
+        self._servers = [
+            self._create_server(host, primary_port, "primary"),
+            self._create_server(host, secondary_port, "secondary")
+        ]
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def base_urls(self) -> List[str]:
+        return [f"http://{server.server_address[0]}:{server.server_address[1]}/" for server in self._servers]
+
+    def start(self) -> "ApiSimulator":
+        for server in self._servers:
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def set_primary_down(self, mode: Optional[str] = "refuse"):
+        """
+        让主地址下线
+        :param mode: refuse为直接断开连接，hang为挂起直至客户端超时，error为返回HTTP 503，None为恢复
+        """
+        if mode not in (None, "refuse", "hang", "error"):
+            raise ValueError(f"未知的下线模式: {mode}")
+        self.primary_down = mode
+
+    def _create_server(self, host: str, port: int, role: str) -> ThreadingHTTPServer:
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # 支持长连接
+            disable_nagle_algorithm = True  # 避免头部和正文分两次发送时触发延迟确认
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length).decode("utf-8") if length else ""
+                self._dispatch(body)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path == "/__control":
+                    self._control(parse_qs(parsed.query))
+                    return
+                self._dispatch("")
+
+            def _dispatch(self, body: str):
+                if role == "primary" and simulator.primary_down:
+                    if simulator.primary_down == "error":
+                        self._reply(503, "")
+                        return
+                    if simulator.primary_down == "hang":
+                        time.sleep(simulator.hang_seconds)
+                    self.close_connection = True
+                    return
+                query = parse_qs(urlparse(self.path).query)
+                form = {k: v[-1] for k, v in parse_qs(body, keep_blank_values=True).items()}
+                try:
+                    endpoint = EndpointType(int(form.get("type") or query.get("type", ["0"])[0]))
+                except ValueError:
+                    self._reply(200, "-81001")
+                    return
+                delay = simulator.backend.latency_for(endpoint)
+                if delay:
+                    time.sleep(delay)
+                self._reply(200, simulator.backend.handle(endpoint, form))
+
+            def _control(self, query: Dict[str, List[str]]):
+                """运行时控制：/__control?primary_down=hang 或 primary_down=none"""
+                if "primary_down" in query:
+                    mode = query["primary_down"][0]
+                    simulator.set_primary_down(None if mode in ("", "none") else mode)
+                self._reply(200, json.dumps({
+                    "primary_down": simulator.primary_down,
+                    "request_counts": simulator.backend.request_counts
+                }, ensure_ascii=False))
+
+            def _reply(self, status: int, text: str):
+                body = text.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/plain; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        return server
+
+
+def _parse_injection(spec: str) -> Tuple[Optional[EndpointType], str, float]:
+    """解析错误注入参数：[接口名:]错误码:概率，例如 CHECK_USER_STATUS:-81040:0.5"""
+    parts = spec.split(":")
+    if len(parts) == 2:
+        return None, parts[0], float(parts[1])
+    return EndpointType[parts[0]], parts[1], float(parts[2])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文心云WebAPI本地模拟服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081, help="主地址端口，备用地址为port+1")
+    parser.add_argument("--users", type=int, default=10, help="预置测试用户数量")
+    parser.add_argument("--cards", type=int, default=10, help="预置卡密数量")
+    parser.add_argument("--billing", choices=["time", "points"], default="time")
+    parser.add_argument("--status-interval", type=float, default=180, help="状态检测最小间隔（秒）")
+    parser.add_argument("--trial-days", type=float, default=1, help="注册用户的试用天数")
+    parser.add_argument("--latency", type=float, default=0, help="基础延迟（毫秒）")
+    parser.add_argument("--jitter", type=float, default=0, help="延迟抖动（毫秒）")
+    parser.add_argument("--tail-probability", type=float, default=0, help="长尾延迟出现概率")
+    parser.add_argument("--tail", type=float, default=0, help="长尾延迟（毫秒）")
+    parser.add_argument("--inject", action="append", default=[],
+                        help="错误注入：[接口名:]错误码:概率，可重复")
+    parser.add_argument("--primary-down", choices=["refuse", "hang", "error"], help="启动时主地址即下线")
+    args = parser.parse_args()
+
+    backend = SimulatedBackend(status_interval=args.status_interval, billing=args.billing,
+                               trial_days=args.trial_days)
+    backend.seed(users=args.users, cards=args.cards)
+    backend.latency[None] = LatencyModel(args.latency, args.jitter, args.tail_probability, args.tail)
+    for spec in args.inject:
+        endpoint, code, probability = _parse_injection(spec)
+        backend.error_injection.setdefault(endpoint, []).append((code, probability))
+
+    simulator = ApiSimulator(backend, args.host, args.port, args.port + 1)
+    simulator.set_primary_down(args.primary_down)
+    simulator.start()
+    print(f"模拟服务已启动: {simulator.base_urls}")
+    print("测试账号: user000001 / pass000001，卡密: CARD000000000001")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        simulator.stop()
+
+
+if __name__ == "__main__":
+    main()
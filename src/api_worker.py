@@ -0,0 +1,103 @@
+from typing import Callable, Dict, Hashable, Optional, Set
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+
+class ApiCall(QRunnable):
+    """提交到线程池的一次调用，可在开始前或执行中取消（取消后结果被丢弃）"""
+
+    def __init__(self, worker: "ApiWorker", tag: Hashable, fn: Callable, args: tuple, kwargs: Dict,
+                 on_result: Optional[Callable], on_error: Optional[Callable]):
+        super().__init__()
+        self.setAutoDelete(False)  # 由Python持有，避免回调前被Qt释放
+        self.worker = worker
+        self.tag = tag
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.on_result = on_result
+        self.on_error = on_error
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        if self.cancelled:
+            # 仍需通知GUI线程，以释放ApiWorker持有的引用
+            self.worker.call_done.emit(self, None, None)
+            return
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.worker.call_done.emit(self, None, str(e))
+        else:
+            self.worker.call_done.emit(self, result, None)
+
+
+class ApiWorker(QObject):
+    """
+    在有界线程池中执行ApiClient调用，结果通过信号回到GUI线程，界面事件循环不再等待网络。
+    同一tag的新调用会取消旧调用：旧调用尚未开始则不再执行，已在执行则丢弃其结果。
+    """
+    call_done = pyqtSignal(object, object, object)  # 调用, 结果, 错误信息（由工作线程发出）
+
+    def __init__(self, parent: Optional[QObject] = None, max_threads: int = 4):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self._latest: Dict[Hashable, ApiCall] = {}  # tag -> 最新一次调用
+        # 已提交且结果尚未派发的调用；线程池不负责释放，取消后仍在执行的调用也必须由Python持有
+        self._pending: Set[ApiCall] = set()
+        # 本对象属于GUI线程，跨线程发出的信号会排队到GUI线程处理
+        self.call_done.connect(self._deliver)
+
+    def submit(self, tag: Hashable, fn: Callable, *args,
+               on_result: Optional[Callable] = None, on_error: Optional[Callable] = None, **kwargs) -> ApiCall:
+        """
+        提交调用
+        :param tag: 调用类别，同类别只保留最新一次的结果
+        :param fn: 在线程池中执行的函数，一般为ApiClient的方法
+        :param on_result: 在GUI线程中以返回值调用
+        :param on_error: 在GUI线程中以异常信息调用
+        """
+        self.cancel(tag)
+        call = ApiCall(self, tag, fn, args, kwargs, on_result, on_error)
+        self._latest[tag] = call
+        self._pending.add(call)
+        self.pool.start(call)
+        return call
+
+    def cancel(self, tag: Hashable):
+        """取消该类别正在等待或执行的调用"""
+        call = self._latest.pop(tag, None)
+        if call is not None:
+            call.cancel()
+            if self.pool.tryTake(call):
+                self._pending.discard(call)
+
+    def cancel_all(self):
+        for tag in list(self._latest):
+            self.cancel(tag)
+
+    def is_busy(self, tag: Hashable) -> bool:
+        return tag in self._latest
+
+    def wait(self, msecs: int = -1) -> bool:
+        """等待线程池中的调用全部结束（结果仍需事件循环派发），用于退出和测试"""
+        return self.pool.waitForDone(msecs)
+
+    @pyqtSlot(object, object, object)
+    def _deliver(self, call: ApiCall, result, error):
+        self._pending.discard(call)
+        # 已取消或被同类新调用取代的结果直接丢弃
+        if call.cancelled or self._latest.get(call.tag) is not call:
+            return
+        del self._latest[call.tag]
+        if error is None:
+            if call.on_result is not None:
+                call.on_result(result)
+        elif call.on_error is not None:
+            call.on_error(error)
+        else:
+            print(f"调用失败: {error}")
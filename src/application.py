@@ -1,6 +1,6 @@
 import sys
 from PyQt5.QtWidgets import QApplication
-from login_window import LoginWindow
+from login_window import UPDATE_CHECK_TTL, LoginWindow
 from main_window import MainWindow
 
 class Application:
@@ -13,18 +13,23 @@ class Application:
         self.functions = feature_config.get('functions', [])
         self.param_definitions = feature_config.get('param_definitions')
         self.if_main_window = feature_config.get('if_main_window', True)
+        self.step_timeout = feature_config.get('step_timeout')
+        self.prefetch_update = feature_config.get('prefetch_update', False)
+        self.prefetch_update_rate = feature_config.get('prefetch_update_rate', 512 * 1024)
+        self.update_check_ttl = feature_config.get('update_check_ttl', UPDATE_CHECK_TTL)
         from api_client import ApiClient
         self.api_client = ApiClient(
             soft_id=app_config['soft_id'],
             version=app_config['version'],
-            mac=app_config['mac']
+            mac=app_config['mac'],
+            base_urls=app_config.get('base_urls')  # 可指向本地模拟服务
         )
 
     def handle_login_success(self, login_info):
         if self.if_main_window:
             print("登录成功，准备打开主窗口...")
             # 创建主窗口
-            self.main_window = MainWindow(login_info=login_info, functions=self.functions, param_definitions=self.param_definitions, api_client=self.api_client,window_name=self.main_window_name,windowicon=self.windowicon)
+            self.main_window = MainWindow(login_info=login_info, functions=self.functions, param_definitions=self.param_definitions, api_client=self.api_client,window_name=self.main_window_name,windowicon=self.windowicon,step_timeout=self.step_timeout)
             self.main_window.show()
         else:
             print("登录成功，执行后续函数")
@@ -37,6 +42,14 @@ class Application:
             title_label=self.login_title_label,
             windowicon=self.windowicon,
             on_login_success=self.handle_login_success,
+            prefetch_update=self.prefetch_update,
+            prefetch_update_rate=self.prefetch_update_rate,
+            update_check_ttl=self.update_check_ttl,
         )
         self.login_window.show()
-        sys.exit(self.app.exec_())
\ No newline at end of file
+        exit_code = self.app.exec_()
+        # 停止未完成的更新下载，已下载部分下次继续
+        self.login_window.stop_downloads()
+        # 退出前释放连接池
+        self.api_client.close()
+        sys.exit(exit_code)
\ No newline at end of file
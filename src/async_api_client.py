@@ -0,0 +1,212 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Sequence
+
+import aiohttp
+
+from api_client import ApiClient, CallResult, EndpointType, _HEDGEABLE_TYPES, _READ_ONLY_TYPES
+from api_errors import ApiResult, ErrorClass, classify_http_status
+from api_metrics import outcome_of
+
+
+class AsyncApiClient(ApiClient):
+    """
+    基于asyncio的文心云WebAPI封装
+
+    与ApiClient覆盖相同的27个接口，错误码映射、地址路由和故障切换完全一致，
+    区别在于每个接口方法返回协程，需要await后得到(是否成功, 响应内容)：
+
+        async with AsyncApiClient(soft_id, version, mac) as client:
+            (ok1, expiry), (ok2, points), (ok3, notice) = await asyncio.gather(
+                client.get_expiry_time(user, pwd),
+                client.get_remaining_points(user, pwd),
+                client.get_announcement(),
+            )
+    """
+
+    def __init__(self, soft_id: str, version: str, mac: str, **kwargs):
+        super().__init__(soft_id, version, mac, **kwargs)
+        self._async_sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._async_inflight: Dict[tuple, asyncio.Future] = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    def _get_async_session(self, base_url: str) -> aiohttp.ClientSession:
+        """获取指定接口地址的长连接会话，需在事件循环内调用"""
+        session = self._async_sessions.get(base_url)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_maxsize, keepalive_timeout=30)
+            session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._async_sessions[base_url] = session
+        return session
+
+    async def aclose(self):
+        """关闭所有异步会话及同步探测用的连接池"""
+        sessions = list(self._async_sessions.values())
+        self._async_sessions.clear()
+        for session in sessions:
+            await session.close()
+        self.close()
+
+    async def call_many(self, calls: Sequence) -> List[CallResult]:
+        """并发执行多个接口调用，参数格式同ApiClient.call_many，并发数受max_workers限制"""
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def timed_call(method, args, kwargs) -> CallResult:
+            async with semaphore:
+                start_time = time.monotonic()
+                try:
+                    success, payload = await method(*args, **kwargs)
+                except Exception as e:
+                    success, payload = False, f"调用异常: {str(e)}"
+                return CallResult(success, payload, time.monotonic() - start_time)
+
+        return list(await asyncio.gather(*(timed_call(*self._resolve_call(call)) for call in calls)))
+
+    async def _send_request(self, params: Dict):
+        """
+        发送请求，与ApiClient._send_request行为一致
+        :param params: 请求参数字典，必须包含type参数
+        :return: (是否成功, 响应内容)
+        """
+        endpoint_type = params.get("type")  # 获取接口类型
+        if not endpoint_type:
+            return "请求参数错误：缺少type参数"
+
+        request_key = self._request_key(params)
+        ttl, cached = self._cache_lookup(params, request_key)
+        if cached is not None:
+            return cached
+        if endpoint_type not in _READ_ONLY_TYPES:
+            return await self._fetch_async(params, request_key, ttl)
+
+        # 只读接口：相同参数的并发调用共享同一个任务，单个调用方取消不影响其他调用方
+        task = self._async_inflight.get(request_key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_async(params, request_key, ttl))
+            self._async_inflight[request_key] = task
+            task.add_done_callback(lambda _: self._async_inflight.pop(request_key, None))
+        else:
+            self._inflight.shared += 1
+        return await asyncio.shield(task)
+
+    async def _fetch_async(self, params: Dict, request_key: tuple, ttl: Optional[float]) -> ApiResult:
+        """发送请求并按重试策略重试，成功结果写入缓存"""
+        endpoint_type = EndpointType(params["type"])
+        # 每次逻辑调用只占用一次限流许可，重试不再申请
+        if self.governor is not None:
+            # 限流排队时让出事件循环，而不是阻塞线程
+            while True:
+                wait = self.governor.try_acquire(endpoint_type)
+                if wait == 0:
+                    break
+                if wait > self.governor.max_wait:
+                    return self._throttled_result(params, wait)
+                await asyncio.sleep(wait)
+        deadline = time.monotonic() + self.retry_policy.deadline
+        self.retry_budget.deposit()
+        attempt = 1
+        reached_server = False
+        while True:
+            result = await self._dispatch_async(params, deadline)
+            reached_server = reached_server or not result.host_failed
+            delay = self._retry_delay(params, result, attempt, deadline)
+            if delay is None:
+                break
+            self.metrics.record_retry(endpoint_type.name)
+            await asyncio.sleep(delay)
+            attempt += 1
+        if self.governor is not None and not reached_server:
+            # 所有尝试都因地址故障失败，服务端未计入本次调用，归还许可
+            self.governor.refund(endpoint_type)
+        self._finish(params, request_key, ttl, result)
+        return result
+
+    async def _dispatch_async(self, params: Dict, deadline: float) -> ApiResult:
+        """按地址路由发送请求，必要时对冲或切换备用地址"""
+        endpoint_type = params["type"]
+        urls = self.router.ordered_urls()
+        result = None
+        if self.hedge_enabled and len(urls) > 1 and endpoint_type in _HEDGEABLE_TYPES:
+            result = await self._send_hedged_async(urls[0], urls[1], params, deadline)
+            if not result.host_failed:
+                return result
+        else:
+            for index, url in enumerate(urls):
+                timeout = min(self.timeout, deadline - time.monotonic())
+                if timeout <= 0:
+                    break
+                if index:
+                    self.metrics.record_failover(EndpointType(endpoint_type).name)
+                result = await self._post_once_async(url, params, timeout)
+                if not result.host_failed:
+                    return result
+        error_class = result.error_class if result is not None else ErrorClass.UNAVAILABLE
+        return ApiResult(False, "接口调用失效", error_class=error_class)
+
+    async def _post_once_async(self, url: str, params: Dict, timeout: Optional[float] = None) -> ApiResult:
+        """向单个地址发送一次请求，地址不可用时错误分类为UNAVAILABLE以便切换备用地址"""
+        start_time = time.monotonic()
+        try:
+            full_url = f"{url}?type={params['type']}"
+            # aiohttp要求表单值为字符串
+            form = {k: str(v) for k, v in params.items()}
+            request_timeout = aiohttp.ClientTimeout(total=timeout or self.timeout)
+            async with self._get_async_session(url).post(full_url, data=form, timeout=request_timeout) as response:
+                text = await response.text()
+            latency = time.monotonic() - start_time
+            if response.status < 400:
+                self.router.record_success(url, latency)
+                result = self._parse_response(text, params)
+            else:
+                self.router.record_failure(url, latency)
+                print(f"服务器响应异常 HTTP {response.status}，切换备用地址")
+                result = ApiResult(False, f"服务器响应异常: HTTP {response.status}",
+                                   error_class=classify_http_status(response.status))
+            outcome = outcome_of(result)
+        except (asyncio.TimeoutError, aiohttp.ClientError, UnicodeDecodeError) as e:
+            # 与ApiClient._post_once一致：响应体不完整、协议错误或无法解码都按地址故障处理
+            latency = time.monotonic() - start_time
+            self.router.record_failure(url, latency)
+            print(f"请求失败，切换备用地址: {e}")
+            result = ApiResult(False, f"网络请求失败: {str(e)}", error_class=ErrorClass.UNAVAILABLE)
+            outcome = "timeout" if isinstance(e, asyncio.TimeoutError) else outcome_of(result)
+            if outcome == "timeout":
+                self.metrics.record_timeout(url)
+        self.metrics.record_request(EndpointType(params["type"]).name, url, latency, outcome)
+        return result
+
+    async def _send_hedged_async(self, primary: str, secondary: str, params: Dict, deadline: float) -> ApiResult:
+        """对冲请求：主地址迟迟未响应或失败时向备用地址补发，落后的请求会被真正取消"""
+        timeout = max(min(self.timeout, deadline - time.monotonic()), 0.001)
+        delay = self.router.latency_percentile(primary, self.hedge_percentile)
+        if delay is None:
+            delay = timeout / 2
+        delay = min(max(delay, self.hedge_min_delay), timeout)
+
+        pending = {asyncio.ensure_future(self._post_once_async(primary, params, timeout))}
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        hedged = False
+        try:
+            while True:
+                for task in done:
+                    result = task.result()
+                    if not result.host_failed:
+                        return result
+                if not hedged:
+                    hedged = True
+                    self.metrics.record_hedge(EndpointType(params["type"]).name)
+                    pending.add(asyncio.ensure_future(self._post_once_async(secondary, params, timeout)))
+                if not pending:
+                    return result
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
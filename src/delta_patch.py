@@ -0,0 +1,310 @@
+"""
+安装包二进制差分：生成、应用和自测
+
+补丁由复制旧文件片段（COPY）和插入新数据（INSERT）两种操作组成，操作流整体用LZMA压缩；
+文件头记录新旧文件的大小和SHA-256，应用前校验旧文件，应用后校验生成的新文件。
+
+    python src/delta_patch.py make setup-1.0.exe setup-1.1.exe setup.exe.1.0.patch
+    python src/delta_patch.py apply setup-1.0.exe setup.exe.1.0.patch setup-1.1.exe
+    python src/delta_patch.py selftest
+
+补丁在发布时离线生成：旧文件按INDEX_STEP建立的索引常驻内存，新文件逐字节查找匹配，
+两个完全不同的8MB文件约需7秒。客户端只应用补丁，应用时按块流式读写。
+"""
+import argparse
+import contextlib
+import hashlib
+import lzma
+import mmap
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+from typing import BinaryIO, Optional
+
+MAGIC = b"WXDELTA1"
+HEADER = struct.Struct("<8sQQ32s32s")  # 魔数, 旧文件大小, 新文件大小, 旧文件SHA-256, 新文件SHA-256
+OP_COPY = b"C"
+OP_INSERT = b"I"
+COPY_ARGS = struct.Struct("<QQ")  # 旧文件偏移, 长度
+INSERT_ARGS = struct.Struct("<Q")  # 长度
+
+KEY_SIZE = 32       # 查找匹配时使用的键长度
+INDEX_STEP = 64     # 旧文件每隔多少字节建立一个索引
+MIN_MATCH = 128     # 短于此长度的匹配不值得单独记为复制
+COMPARE_BLOCK = 64 * 1024
+COPY_BLOCK = 1024 * 1024
+
+
+class PatchError(Exception):
+    """补丁格式错误或校验失败"""
+
+
+def _sha256_file(path: str) -> bytes:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(COPY_BLOCK), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+def _match_length(old: memoryview, old_pos: int, new: memoryview, new_pos: int) -> int:
+    """old[old_pos:]与new[new_pos:]相同前缀的长度：先按块比较，再在不同的块内二分"""
+    limit = min(len(old) - old_pos, len(new) - new_pos)
+    length = 0
+    while length < limit:
+        size = min(COMPARE_BLOCK, limit - length)
+        if old[old_pos + length:old_pos + length + size] == new[new_pos + length:new_pos + length + size]:
+            length += size
+            continue
+        low, high = 0, size  # 相同前缀在[low, high)之间
+        while high - low > 1:
+            middle = (low + high) // 2
+            if old[old_pos + length:old_pos + length + middle] == new[new_pos + length:new_pos + length + middle]:
+                low = middle
+            else:
+                high = middle
+        return length + low
+    return length
+
+
+def _match_length_backward(old: memoryview, old_end: int, new: memoryview, new_end: int, limit: int) -> int:
+    """old[:old_end]与new[:new_end]相同后缀的长度，最多limit字节；与_match_length一样按块比较再二分"""
+    length = 0
+    while length < limit:
+        size = min(COMPARE_BLOCK, limit - length)
+        if old[old_end - length - size:old_end - length] == new[new_end - length - size:new_end - length]:
+            length += size
+            continue
+        low, high = 0, size  # 相同后缀在[low, high)之间
+        while high - low > 1:
+            middle = (low + high) // 2
+            if old[old_end - length - middle:old_end - length] == new[new_end - length - middle:new_end - length]:
+                low = middle
+            else:
+                high = middle
+        return length + low
+    return length
+
+
+def _map_file(f: BinaryIO):
+    """只读映射文件，不把整个安装包读入内存；空文件无法映射，直接返回空数据"""
+    if os.fstat(f.fileno()).st_size == 0:
+        return contextlib.nullcontext(b"")
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class _OpWriter:
+    """把操作写入压缩流，相邻的复制操作合并"""
+
+    def __init__(self, out: BinaryIO):
+        self.out = out
+        self.copy_offset: Optional[int] = None
+        self.copy_length = 0
+
+    def copy(self, offset: int, length: int):
+        if self.copy_offset is not None and self.copy_offset + self.copy_length == offset:
+            self.copy_length += length
+            return
+        self.flush()
+        self.copy_offset, self.copy_length = offset, length
+
+    def insert(self, data: bytes):
+        if not data:
+            return
+        self.flush()
+        self.out.write(OP_INSERT + INSERT_ARGS.pack(len(data)))
+        self.out.write(data)
+
+    def flush(self):
+        if self.copy_offset is not None:
+            self.out.write(OP_COPY + COPY_ARGS.pack(self.copy_offset, self.copy_length))
+            self.copy_offset = None
+
+
+def make_patch(old_path: str, new_path: str, patch_path: str) -> int:
+    """
+    生成从旧文件到新文件的补丁
+    :return: 补丁大小（字节）
+    """
+    with open(old_path, "rb") as old_file, open(new_path, "rb") as new_file, \
+            _map_file(old_file) as old_data, _map_file(new_file) as new_data, \
+            memoryview(old_data) as old, memoryview(new_data) as new:
+        _write_patch(old_data, new_data, old, new, patch_path)
+    return os.path.getsize(patch_path)
+
+
+def _write_patch(old_data, new_data, old: memoryview, new: memoryview, patch_path: str):
+    # 旧文件按固定间隔建立 键 -> 偏移 的索引
+    index = {}
+    for offset in range(0, len(old_data) - KEY_SIZE + 1, INDEX_STEP):
+        index.setdefault(old_data[offset:offset + KEY_SIZE], offset)
+
+    header = HEADER.pack(MAGIC, len(old_data), len(new_data),
+                         hashlib.sha256(old_data).digest(), hashlib.sha256(new_data).digest())
+    with open(patch_path, "wb") as patch_file:
+        patch_file.write(header)
+        with lzma.open(patch_file, "wb", preset=6) as out:
+            writer = _OpWriter(out)
+            position = literal_start = 0
+            end = len(new_data) - KEY_SIZE
+            while position <= end:
+                offset = index.get(new_data[position:position + KEY_SIZE])
+                if offset is None:
+                    position += 1
+                    continue
+                length = _match_length(old, offset, new, position)
+                if length < MIN_MATCH:
+                    position += 1
+                    continue
+                # 向前扩展匹配，吸收待插入数据的末尾
+                back = _match_length_backward(old, offset, new, position, min(position - literal_start, offset))
+                writer.insert(new_data[literal_start:position - back])
+                writer.copy(offset - back, length + back)
+                position += length
+                literal_start = position
+            writer.insert(new_data[literal_start:])
+            writer.flush()
+
+
+def apply_patch(old_path: str, patch_path: str, out_path: str) -> str:
+    """
+    用补丁从旧文件生成新文件，旧文件或结果与补丁记录的SHA-256不一致时抛出PatchError
+    :return: 新文件的SHA-256
+    """
+    with open(patch_path, "rb") as patch_file:
+        magic, old_size, new_size, old_sha256, new_sha256 = HEADER.unpack(patch_file.read(HEADER.size))
+        if magic != MAGIC:
+            raise PatchError("不是有效的补丁文件")
+        if os.path.getsize(old_path) != old_size or _sha256_file(old_path) != old_sha256:
+            raise PatchError("旧文件与补丁不匹配")
+
+        digest = hashlib.sha256()
+        written = 0
+        with lzma.open(patch_file, "rb") as ops, open(old_path, "rb") as old_file, open(out_path, "wb") as out:
+            while True:
+                op = ops.read(1)
+                if not op:
+                    break
+                if op == OP_COPY:
+                    offset, length = COPY_ARGS.unpack(ops.read(COPY_ARGS.size))
+                    if offset + length > old_size:
+                        raise PatchError("补丁复制范围超出旧文件")
+                    old_file.seek(offset)
+                    while length:
+                        block = old_file.read(min(COPY_BLOCK, length))
+                        out.write(block)
+                        digest.update(block)
+                        length -= len(block)
+                        written += len(block)
+                elif op == OP_INSERT:
+                    (length,) = INSERT_ARGS.unpack(ops.read(INSERT_ARGS.size))
+                    while length:
+                        block = ops.read(min(COPY_BLOCK, length))
+                        if not block:
+                            raise PatchError("补丁数据不完整")
+                        out.write(block)
+                        digest.update(block)
+                        length -= len(block)
+                        written += len(block)
+                else:
+                    raise PatchError(f"未知的补丁操作: {op!r}")
+
+    if written != new_size or digest.digest() != new_sha256:
+        os.remove(out_path)
+        raise PatchError("生成的文件校验失败")
+    return digest.hexdigest()
+
+
+def _random_bytes(rng: random.Random, size: int) -> bytes:
+    # Random.randbytes需要Python 3.9
+    return rng.getrandbits(8 * size).to_bytes(size, "little") if size else b""
+
+
+def _mutate(data: bytes, changes: int, rng: random.Random) -> bytes:
+    """模拟新版本：随机插入、删除和替换若干片段"""
+    data = bytearray(data)
+    for _ in range(changes):
+        position = rng.randrange(len(data))
+        size = rng.randint(1, 4096)
+        action = rng.choice(("insert", "delete", "replace"))
+        if action == "insert":
+            data[position:position] = _random_bytes(rng, size)
+        elif action == "delete":
+            del data[position:position + size]
+        else:
+            data[position:position + size] = _random_bytes(rng, min(size, len(data) - position))
+    return bytes(data)
+
+
+def selftest(size: int, changes: int, seed: int) -> bool:
+    """生成随机的新旧文件，验证补丁往返结果一致，并输出补丁大小和耗时"""
+    rng = random.Random(seed)
+    # 混合随机数据和重复数据，接近真实安装包的可压缩程度
+    pieces = []
+    while sum(map(len, pieces)) < size:
+        pieces.append(_random_bytes(rng, 4096) if rng.random() < 0.5 else bytes([rng.randrange(256)]) * 4096)
+    old_data = b"".join(pieces)[:size]
+    new_data = _mutate(old_data, changes, rng)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        old_path = os.path.join(temp_dir, "old.bin")
+        new_path = os.path.join(temp_dir, "new.bin")
+        patch_path = os.path.join(temp_dir, "new.patch")
+        out_path = os.path.join(temp_dir, "out.bin")
+        with open(old_path, "wb") as f:
+            f.write(old_data)
+        with open(new_path, "wb") as f:
+            f.write(new_data)
+
+        start = time.perf_counter()
+        patch_size = make_patch(old_path, new_path, patch_path)
+        make_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        apply_patch(old_path, patch_path, out_path)
+        apply_seconds = time.perf_counter() - start
+        with open(out_path, "rb") as f:
+            ok = f.read() == new_data
+
+    full_size = len(lzma.compress(new_data, preset=6))
+    print(f"旧文件 {len(old_data)} 字节，新文件 {len(new_data)} 字节，{changes} 处改动")
+    print(f"补丁 {patch_size} 字节（完整压缩包 {full_size} 字节的 {patch_size / full_size:.1%}）")
+    print(f"生成 {make_seconds:.2f}s，应用 {apply_seconds:.2f}s，结果{'一致' if ok else '不一致'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="安装包二进制差分")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    make_parser = subparsers.add_parser("make", help="生成补丁")
+    make_parser.add_argument("old")
+    make_parser.add_argument("new")
+    make_parser.add_argument("patch")
+    apply_parser = subparsers.add_parser("apply", help="应用补丁")
+    apply_parser.add_argument("old")
+    apply_parser.add_argument("patch")
+    apply_parser.add_argument("out")
+    test_parser = subparsers.add_parser("selftest", help="用随机数据验证生成和应用")
+    test_parser.add_argument("--size", type=int, default=8 * 1024 * 1024, help="旧文件大小（字节）")
+    test_parser.add_argument("--changes", type=int, default=20, help="随机改动数量")
+    test_parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.command == "make":
+        patch_size = make_patch(args.old, args.new, args.patch)
+        print(f"补丁已生成: {args.patch}（{patch_size} 字节，新文件 {os.path.getsize(args.new)} 字节）")
+    elif args.command == "apply":
+        try:
+            sha256 = apply_patch(args.old, args.patch, args.out)
+        except PatchError as e:
+            print(f"应用补丁失败: {e}")
+            sys.exit(1)
+        print(f"已生成 {args.out}（SHA-256 {sha256}）")
+    else:
+        sys.exit(0 if selftest(args.size, args.changes, args.seed) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+import errno
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from typing import Callable, List, Optional
+
+CONTENT_RANGE_PATTERN = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+# 每次读取的字节数按测得的带宽调整为约READ_TARGET_SECONDS秒的数据量
+MIN_READ_SIZE = 16 * 1024
+MAX_READ_SIZE = 1024 * 1024
+READ_TARGET_SECONDS = 0.05
+MIN_SAMPLE_SECONDS = 0.02  # 吞吐率估计的最小采样间隔
+
+
+class DownloadCancelled(Exception):
+    """下载被取消"""
+
+
+class RemoteFileChanged(IOError):
+    """下载过程中服务端文件发生变化，已下载的部分作废"""
+
+
+def _preallocate(out_file, size: int):
+    """把文件预分配到size字节；支持时直接分配磁盘空间，空间不足在开始下载前就会报错"""
+    out_file.truncate(size)
+    if size and hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(out_file.fileno(), 0, size)
+        except OSError as e:
+            if e.errno not in (errno.EINVAL, errno.EOPNOTSUPP):  # 文件系统不支持时保留稀疏文件
+                raise
+
+
+def _write_all(out_file, data: memoryview):
+    """无缓冲文件的write可能只写入一部分，循环直到全部写入"""
+    while data:
+        data = data[out_file.write(data):]
+
+
+class ThroughputEstimator:
+    """吞吐率估计：按时间加权的指数移动平均，每次更新O(1)"""
+    __slots__ = ("half_life", "rate", "_total", "_updated")
+
+    def __init__(self, half_life: float = 1.0):
+        """
+        :param half_life: 旧数据的权重衰减一半所需的秒数
+        """
+        self.half_life = half_life
+        self.rate = 0.0  # 字节/秒
+        self._total = 0
+        self._updated: Optional[float] = None
+
+    def update(self, total: int, now: Optional[float] = None) -> float:
+        """
+        :param total: 截至目前的累计字节数
+        :return: 更新后的吞吐率（字节/秒）
+        """
+        now = time.monotonic() if now is None else now
+        if self._updated is None:
+            self._total, self._updated = total, now
+            return self.rate
+        elapsed = now - self._updated
+        if elapsed < MIN_SAMPLE_SECONDS:
+            return self.rate  # 间隔过短的样本噪声大，累计到下一次
+        instant = (total - self._total) / elapsed
+        if self.rate == 0:
+            self.rate = instant
+        else:
+            self.rate += (instant - self.rate) * (1 - 0.5 ** (elapsed / self.half_life))
+        self._total, self._updated = total, now
+        return self.rate
+
+    def read_size(self) -> int:
+        """按当前吞吐率计算下一次读取的字节数"""
+        size = int(self.rate * READ_TARGET_SECONDS) // MIN_READ_SIZE * MIN_READ_SIZE
+        return min(MAX_READ_SIZE, max(MIN_READ_SIZE, size))
+
+
+class Segment:
+    """文件中的一段：[start, end]闭区间，downloaded为已写入的字节数"""
+    __slots__ = ("start", "end", "downloaded")
+
+    def __init__(self, start: int, end: int, downloaded: int = 0):
+        self.start = start
+        self.end = end
+        self.downloaded = downloaded
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start + 1
+
+    @property
+    def done(self) -> bool:
+        return self.downloaded >= self.size
+
+
+class DownloadEngine:
+    """
+    分段下载：服务端支持Range时将文件分为多段并行下载到预分配的临时文件，
+    各段进度保存在 <文件>.part.json，中断后再次下载从断点继续；
+    不支持Range或无法获知文件大小时退回单连接顺序下载。
+    下载过程中按文件顺序增量计算SHA-256，完成后无需再次读取整个文件校验。
+    """
+
+    def __init__(self, url: str, save_path: str, segments: int = 4,
+                 min_segment_size: int = 1024 * 1024, timeout: float = 15, retries: int = 3,
+                 progress: Optional[Callable[[int, Optional[int], float], None]] = None,
+                 report_interval: float = 0.2, expected_sha256: Optional[str] = None,
+                 max_rate: Optional[float] = None):
+        """
+        :param segments: 最多并行下载的段数
+        :param min_segment_size: 每段的最小字节数，小文件不再切分
+        :param timeout: 连接和读取超时（秒）
+        :param retries: 每段连接中断后的重试次数
+        :param progress: 进度回调 (已下载字节数, 总字节数或None, 吞吐率字节/秒)，在调用run的线程中执行
+        :param report_interval: 两次进度回调的最小间隔（秒）
+        :param expected_sha256: 文件应有的SHA-256，不一致时删除已下载数据并抛出异常
+        :param max_rate: 限速（字节/秒），None表示不限
+        """
+        self.url = url
+        self.save_path = save_path
+        self.part_path = save_path + ".part"
+        self.state_path = save_path + ".part.json"
+        self.segments = segments
+        self.min_segment_size = min_segment_size
+        self.timeout = timeout
+        self.retries = retries
+        self.progress = progress
+        self.report_interval = report_interval
+        self.throughput = ThroughputEstimator()
+        self.expected_sha256 = expected_sha256.lower() if expected_sha256 else None
+        self.sha256: Optional[str] = None  # 下载完成后的文件SHA-256
+        self.size: Optional[int] = None
+        self.validator: Optional[str] = None  # 服务端文件的ETag或Last-Modified，用于续传时确认文件未变
+        self.downloaded = 0
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._running = threading.Event()  # 未暂停时置位
+        self._running.set()
+        self.max_rate = max_rate
+        self._rate_next = 0.0  # 限速时下一次允许读取的时间
+        # 哈希随下载增量计算，_hashed为已计入哈希的字节数（从文件开头连续）
+        self._hasher = hashlib.sha256()
+        self._hashed = 0
+        self._hash_lock = threading.Lock()
+        self._hash_buffer = memoryview(bytearray(MAX_READ_SIZE))  # 补算哈希时从文件读回数据，持有_hash_lock时使用
+        self._segments: List[Segment] = []
+
+    def pause(self):
+        """暂停下载，连接保持到服务端超时，恢复后自动重连"""
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def set_max_rate(self, max_rate: Optional[float]):
+        """调整限速（字节/秒），None表示不限"""
+        with self._lock:
+            self.max_rate = max_rate
+            self._rate_next = 0.0
+
+    def _throttle(self, size: int):
+        """每次读取后调用：暂停时等待恢复，限速时按已读取的数据量推迟下一次读取"""
+        while not self._running.wait(0.2):
+            if self._cancelled.is_set():
+                raise DownloadCancelled("下载已取消")
+        with self._lock:
+            if not self.max_rate:
+                return
+            now = time.monotonic()
+            self._rate_next = max(self._rate_next, now) + size / self.max_rate
+            delay = self._rate_next - now
+        if delay > 0:
+            self._cancelled.wait(delay)
+
+    def cancel(self):
+        """取消下载，已下载的部分保留用于续传"""
+        self._cancelled.set()
+
+    def run(self) -> str:
+        """执行下载，成功返回保存路径，失败抛出异常"""
+        try:
+            response = self._open(range_start=0, range_end=0)
+        except urllib.error.HTTPError as e:
+            if e.code != 416:  # 空文件不能请求Range
+                raise
+            response = self._open()
+        try:
+            self.validator = self._validator(response)
+            size = self._range_total(response)
+            if size is None:
+                # 不支持Range：直接使用这次响应顺序下载
+                self._download_stream(response)
+                return self._finish()
+        finally:
+            response.close()
+        self.size = size
+        self._segments = self._load_state(size) or self._new_segments(size)
+        try:
+            self._download_segments(self._segments)
+        except RemoteFileChanged:
+            self.discard()  # 下次从头下载
+            raise
+        with open(self.part_path, "rb", buffering=0) as read_file, self._hash_lock:
+            self._hash_catch_up(read_file)
+        return self._finish()
+
+    # -------------------- 分段下载 --------------------
+
+    def _new_segments(self, size: int) -> List[Segment]:
+        count = max(1, min(self.segments, size // self.min_segment_size))
+        step = size // count
+        segments = []
+        for index in range(count):
+            start = index * step
+            end = size - 1 if index == count - 1 else start + step - 1
+            segments.append(Segment(start, end))
+        # 预分配文件，各段直接写入自己的位置
+        with open(self.part_path, "wb") as f:
+            _preallocate(f, size)
+        return segments
+
+    def _load_state(self, size: int) -> Optional[List[Segment]]:
+        """读取上次未完成的下载进度，与本次文件不一致时返回None"""
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            # 大小相同但内容已更新的文件由ETag/Last-Modified区分
+            if (state.get("url") != self.url or state.get("size") != size
+                    or state.get("validator") != self.validator
+                    or os.path.getsize(self.part_path) != size):
+                return None
+            segments = [Segment(*values) for values in state["segments"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        print(f"继续上次的下载: {sum(s.downloaded for s in segments)}/{size} 字节")
+        return segments
+
+    def _save_state(self, segments: List[Segment]):
+        with self._lock:
+            state = {
+                "url": self.url,
+                "size": self.size,
+                "validator": self.validator,
+                "segments": [[s.start, s.end, s.downloaded] for s in segments]
+            }
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(temp_path, self.state_path)
+
+    def _download_segments(self, segments: List[Segment]):
+        self.downloaded = sum(s.downloaded for s in segments)
+        self.throughput.update(self.downloaded)
+        pending = [s for s in segments if not s.done]
+        if not pending:
+            return
+        # 续传时先计入上次已下载的连续部分
+        with open(self.part_path, "rb", buffering=0) as read_file, self._hash_lock:
+            self._hash_catch_up(read_file)
+        self._save_state(segments)
+        with ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix="download") as executor:
+            futures = [executor.submit(self._download_segment, segment) for segment in pending]
+            try:
+                while True:
+                    done, not_done = wait(futures, timeout=self.report_interval, return_when=FIRST_EXCEPTION)
+                    self._report()
+                    failed = [f for f in done if f.exception() is not None]
+                    if failed:
+                        self._cancelled.set()  # 让其余段尽快停止
+                        raise failed[0].exception()
+                    if not not_done:
+                        break
+                    self._save_state(segments)
+            finally:
+                wait(futures)
+                self._save_state(segments)
+
+    def _download_segment(self, segment: Segment):
+        attempt = 0
+        # 数据直接读入可复用的缓冲区再写入文件，循环中不再为每次读取分配新对象
+        buffer = memoryview(bytearray(MAX_READ_SIZE))
+        # 不使用缓冲，保存的进度不会超过实际写入文件的数据
+        with open(self.part_path, "r+b", buffering=0) as out_file, \
+                open(self.part_path, "rb", buffering=0) as read_file:
+            while not segment.done:
+                if self._cancelled.is_set():
+                    raise DownloadCancelled("下载已取消")
+                start = segment.start + segment.downloaded
+                try:
+                    response = self._open(range_start=start, range_end=segment.end, if_range=self.validator)
+                    with response:
+                        if response.status == 200 and self.validator:
+                            # If-Range不匹配时服务端返回完整的新文件
+                            raise RemoteFileChanged("服务端文件已更新，需要重新下载")
+                        content_range = CONTENT_RANGE_PATTERN.match(response.headers.get("Content-Range", ""))
+                        if response.status != 206 or not content_range or int(content_range.group(1)) != start:
+                            raise IOError(f"服务端未按请求返回分段: HTTP {response.status}")
+                        out_file.seek(start)
+                        throughput = ThroughputEstimator(half_life=0.5)
+                        received = 0
+                        while not segment.done:
+                            if self._cancelled.is_set():
+                                raise DownloadCancelled("下载已取消")
+                            count = response.readinto(
+                                buffer[:min(throughput.read_size(), segment.size - segment.downloaded)])
+                            if not count:
+                                raise IOError("连接中断")
+                            position = segment.start + segment.downloaded
+                            _write_all(out_file, buffer[:count])
+                            with self._lock:
+                                segment.downloaded += count
+                                self.downloaded += count
+                            self._hash_chunk(position, buffer[:count], read_file)
+                            received += count
+                            throughput.update(received)
+                            self._throttle(count)
+                            attempt = 0
+                except (DownloadCancelled, RemoteFileChanged):
+                    raise
+                except (OSError, ValueError) as e:
+                    attempt += 1
+                    if attempt > self.retries:
+                        raise
+                    print(f"分段 {segment.start}-{segment.end} 下载中断，第{attempt}次重试: {e}")
+                    self._cancelled.wait(min(2 ** attempt, 10))
+
+    def _hash_chunk(self, position: int, chunk: memoryview, read_file):
+        """
+        按文件顺序增量计算哈希：正好接在已哈希位置的数据直接计入，
+        后面各段提前到达的数据在哈希位置追上时从文件读回（仍在系统缓存中）
+        """
+        with self._hash_lock:
+            if position == self._hashed:
+                self._hasher.update(chunk)
+                self._hashed += len(chunk)
+            self._hash_catch_up(read_file)
+
+    def _hash_catch_up(self, read_file):
+        """计入已哈希位置之后已经写入文件的连续数据，调用方需持有_hash_lock"""
+        while self._hashed < self.size:
+            segment = next(s for s in self._segments if s.start <= self._hashed <= s.end)
+            with self._lock:
+                available = segment.start + segment.downloaded - self._hashed
+            if available <= 0:
+                return
+            read_file.seek(self._hashed)
+            count = read_file.readinto(self._hash_buffer[:min(available, MAX_READ_SIZE)])
+            if not count:
+                return
+            self._hasher.update(self._hash_buffer[:count])
+            self._hashed += count
+
+    # -------------------- 单连接下载 --------------------
+
+    def _download_stream(self, response):
+        length = response.headers.get("Content-Length")
+        self.size = int(length) if length else None
+        self.downloaded = 0
+        self.throughput.update(0)
+        throughput = ThroughputEstimator(half_life=0.5)
+        buffer = memoryview(bytearray(MAX_READ_SIZE))
+        with open(self.part_path, "wb", buffering=0) as out_file:
+            if self.size is not None:
+                _preallocate(out_file, self.size)
+            last_report = 0.0
+            while True:
+                if self._cancelled.is_set():
+                    raise DownloadCancelled("下载已取消")
+                count = response.readinto(buffer[:throughput.read_size()])
+                if not count:
+                    break
+                _write_all(out_file, buffer[:count])
+                self._hasher.update(buffer[:count])
+                self.downloaded += count
+                now = time.monotonic()
+                throughput.update(self.downloaded, now)
+                self._throttle(count)
+                if now - last_report >= self.report_interval:
+                    last_report = now
+                    self._report()
+        if self.size is not None and self.downloaded != self.size:
+            raise IOError(f"下载不完整: {self.downloaded}/{self.size} 字节")
+        self.size = self._hashed = self.downloaded
+        self._report()
+
+    # -------------------- 公共 --------------------
+
+    def _open(self, range_start: Optional[int] = None, range_end: Optional[int] = None,
+              if_range: Optional[str] = None):
+        request = urllib.request.Request(self.url)
+        request.add_header("User-Agent", "Mozilla/5.0")
+        if range_start is not None:
+            request.add_header("Range", f"bytes={range_start}-{range_end}")
+            if if_range:
+                request.add_header("If-Range", if_range)
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    @staticmethod
+    def _validator(response) -> Optional[str]:
+        """If-Range只接受强ETag，否则使用Last-Modified"""
+        etag = response.headers.get("ETag")
+        if etag and not etag.startswith("W/"):
+            return etag
+        return response.headers.get("Last-Modified")
+
+    @staticmethod
+    def _range_total(response) -> Optional[int]:
+        """服务端支持Range时返回文件总大小，否则返回None"""
+        if response.status != 206:
+            return None
+        match = CONTENT_RANGE_PATTERN.match(response.headers.get("Content-Range", ""))
+        if not match or match.group(3) == "*":
+            return None
+        return int(match.group(3))
+
+    def discard(self):
+        """删除已下载的部分和进度"""
+        for path in (self.part_path, self.state_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _report(self):
+        rate = self.throughput.update(self.downloaded)
+        if self.progress is not None:
+            self.progress(self.downloaded, self.size, rate)
+
+    def _finish(self) -> str:
+        if self._hashed != self.size:
+            raise IOError(f"下载不完整: {self._hashed}/{self.size} 字节")
+        self.sha256 = self._hasher.hexdigest()
+        if self.expected_sha256 and self.sha256 != self.expected_sha256:
+            # 数据已损坏，删除后下次重新下载
+            self.discard()
+            raise IOError(f"文件校验失败: SHA-256 {self.sha256} 与预期 {self.expected_sha256} 不一致")
+        os.replace(self.part_path, self.save_path)
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        self._report()
+        return self.save_path
@@ -0,0 +1,162 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+
+class HostHealth:
+    """单个接口地址的健康状态"""
+
+    def __init__(self, url: str, initial_latency: float):
+        self.url = url
+        self.success_rate = 1.0  # 成功率EWMA
+        self.latency = initial_latency  # 延迟EWMA（秒）
+        self.consecutive_failures = 0
+        self.circuit_open = False
+        self.opened_at = 0.0
+        self.cooldown = 0.0
+        self.probing = False
+        self.samples = deque(maxlen=200)  # 最近成功请求的延迟样本
+
+    def score(self) -> float:
+        """健康评分，越小越好"""
+        return self.latency / max(self.success_rate, 0.05)
+
+
+class EndpointRouter:
+    """
+    接口地址路由：按EWMA统计成功率和延迟，粘滞选择最健康的地址；
+    连续失败后熔断该地址，冷却后在后台探测，探测成功才恢复
+    """
+
+    def __init__(self, urls: List[str], probe: Optional[Callable[[str], bool]] = None,
+                 alpha: float = 0.3, initial_latency: float = 0.5,
+                 failure_threshold: int = 3, open_seconds: float = 30,
+                 max_open_seconds: float = 300, stickiness: float = 1.5):
+        """
+        :param urls: 接口地址列表，顺序即初始优先级
+        :param probe: 探测函数，参数为地址，返回地址是否可用
+        :param alpha: EWMA平滑系数
+        :param failure_threshold: 连续失败多少次后熔断
+        :param open_seconds: 熔断后首次探测前的冷却时间（秒）
+        :param max_open_seconds: 探测失败后冷却时间翻倍的上限（秒）
+        :param stickiness: 其他地址评分需优于当前地址的倍数才会切换
+        """
+        self.probe = probe
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.stickiness = stickiness
+        self._hosts: Dict[str, HostHealth] = {url: HostHealth(url, initial_latency) for url in urls}
+        self._order = list(urls)
+        self._current = self._order[0] if self._order else None
+        self._lock = threading.Lock()
+
+    def ordered_urls(self) -> List[str]:
+        """返回本次请求应依次尝试的地址，已熔断的地址只在全部熔断时作为兜底"""
+        with self._lock:
+            self._schedule_probes()
+            closed = [url for url in self._order if not self._hosts[url].circuit_open]
+            if not closed:
+                return sorted(self._order, key=lambda url: self._hosts[url].score())
+            closed.sort(key=lambda url: self._hosts[url].score())
+            if self._current in closed:
+                closed.remove(self._current)
+                closed.insert(0, self._current)
+            return closed
+
+    def record_success(self, url: str, latency: float):
+        """记录一次成功请求"""
+        with self._lock:
+            host = self._hosts.get(url)
+            if host is None:
+                return
+            host.success_rate += self.alpha * (1.0 - host.success_rate)
+            host.latency += self.alpha * (latency - host.latency)
+            host.consecutive_failures = 0
+            host.samples.append(latency)
+            if host.circuit_open:
+                # 全部熔断时兜底请求成功，直接恢复该地址
+                host.circuit_open = False
+            self._update_current()
+
+    def record_failure(self, url: str, latency: float):
+        """记录一次失败请求，连续失败达到阈值时熔断"""
+        with self._lock:
+            host = self._hosts.get(url)
+            if host is None:
+                return
+            host.success_rate += self.alpha * (0.0 - host.success_rate)
+            host.latency += self.alpha * (latency - host.latency)
+            host.consecutive_failures += 1
+            if not host.circuit_open and host.consecutive_failures >= self.failure_threshold:
+                self._open_circuit(host, self.open_seconds)
+                print(f"接口地址已熔断: {url}")
+            self._update_current()
+
+    def latency_percentile(self, url: str, percentile: float) -> Optional[float]:
+        """返回地址最近成功请求延迟的分位数（秒），无样本时返回None"""
+        with self._lock:
+            host = self._hosts.get(url)
+            if host is None or not host.samples:
+                return None
+            samples = sorted(host.samples)
+        index = min(int(len(samples) * percentile), len(samples) - 1)
+        return samples[index]
+
+    def get_health(self) -> Dict[str, Dict]:
+        """返回各地址的健康状态快照"""
+        with self._lock:
+            return {
+                url: {
+                    "success_rate": host.success_rate,
+                    "latency": host.latency,
+                    "consecutive_failures": host.consecutive_failures,
+                    "circuit_open": host.circuit_open,
+                    "current": url == self._current
+                }
+                for url, host in self._hosts.items()
+            }
+
+    def _open_circuit(self, host: HostHealth, cooldown: float):
+        host.circuit_open = True
+        host.opened_at = time.monotonic()
+        host.cooldown = cooldown
+
+    def _update_current(self):
+        """粘滞切换：当前地址熔断或明显劣于其他地址时才切换"""
+        candidates = [host for host in self._hosts.values() if not host.circuit_open]
+        if not candidates:
+            return
+        best = min(candidates, key=HostHealth.score)
+        current = self._hosts.get(self._current)
+        if (current is None or current.circuit_open
+                or best.score() * self.stickiness < current.score()):
+            self._current = best.url
+
+    def _schedule_probes(self):
+        """为冷却结束的熔断地址启动后台探测"""
+        if self.probe is None:
+            return
+        now = time.monotonic()
+        for host in self._hosts.values():
+            if host.circuit_open and not host.probing and now - host.opened_at >= host.cooldown:
+                host.probing = True
+                threading.Thread(target=self._run_probe, args=(host,), daemon=True).start()
+
+    def _run_probe(self, host: HostHealth):
+        try:
+            healthy = self.probe(host.url)
+        except Exception:
+            healthy = False
+        with self._lock:
+            host.probing = False
+            if healthy:
+                host.circuit_open = False
+                host.consecutive_failures = 0
+                host.success_rate = 0.5  # 恢复后需要重新积累健康度
+                print(f"接口地址已恢复: {host.url}")
+                self._update_current()
+            else:
+                self._open_circuit(host, min(host.cooldown * 2, self.max_open_seconds))
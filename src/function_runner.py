@@ -0,0 +1,159 @@
+import inspect
+import threading
+import time
+from typing import Callable, List, Optional
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class StepCancelled(Exception):
+    """步骤因停止运行而中止"""
+
+
+class StepTimeout(Exception):
+    """步骤执行超过了允许的时间"""
+
+
+class CancelToken:
+    """
+    传给步骤函数的取消令牌：停止运行或步骤超时后cancelled为真。
+    耗时的步骤应定期检查cancelled，或用wait(秒)代替time.sleep，取消时立即返回。
+    """
+    __slots__ = ("_event", "_deadline")
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._deadline = None  # 当前步骤的截止时间（time.monotonic）
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or self.timed_out
+
+    @property
+    def timed_out(self) -> bool:
+        return self._deadline is not None and time.monotonic() >= self._deadline
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待最多timeout秒（不超过步骤截止时间），返回是否已取消"""
+        if self._deadline is not None:
+            remaining = max(0.0, self._deadline - time.monotonic())
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        self._event.wait(timeout)
+        return self.cancelled
+
+    def raise_if_cancelled(self):
+        if self.timed_out:
+            raise StepTimeout("步骤执行超时")
+        if self._event.is_set():
+            raise StepCancelled("已停止")
+
+
+def _accepts_cancel_token(func: Callable) -> bool:
+    try:
+        parameter = inspect.signature(func).parameters.get("cancel_token")
+    except (TypeError, ValueError):
+        return False
+    return parameter is not None and parameter.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD,
+                                                        inspect.Parameter.KEYWORD_ONLY)
+
+
+class FunctionRunner(QThread):
+    """
+    依次执行功能函数，上一步返回值的第二项起作为下一步的参数。
+    暂停、继续和停止通过事件通知，暂停时不占用CPU；声明了cancel_token参数的函数会收到CancelToken，
+    可在停止或超时时提前结束。停止不等待当前步骤返回，线程在步骤结束后发出finished。
+    步骤超时后停止运行，不会重复执行该步骤。
+    """
+    finished = pyqtSignal()
+    result_ready = pyqtSignal(str)
+
+    def __init__(self, functions: List[Callable], loop: bool = True, timeout: Optional[float] = None):
+        """
+        :param timeout: 每一步的超时（秒），函数的timeout属性可单独指定，None表示不限；超时后停止运行
+        """
+        super().__init__()
+        self.functions = functions
+        self.loop = loop
+        self.timeout = timeout
+        self._is_running = True
+        self._resumed = threading.Event()  # 未暂停时置位
+        self._resumed.set()
+        self._token = CancelToken()
+        # 按函数预先确定是否传入令牌和超时，循环中不再检查
+        accepts = {func: _accepts_cancel_token(func) for func in set(functions)}
+        self._accepts_token = [accepts[func] for func in functions]
+        self._timeouts = [getattr(func, 'timeout', timeout) for func in functions]
+        self._current_index = 0
+        self._current_params = []
+
+    def run(self):
+        token = self._token
+        while True:
+            if not self._resumed.is_set():
+                self._resumed.wait()
+            if not self._is_running:
+                break
+
+            func = self.functions[self._current_index]
+            timeout = self._timeouts[self._current_index]
+            token._deadline = time.monotonic() + timeout if timeout else None
+            try:
+                # 执行函数并获取结果
+                if self._accepts_token[self._current_index]:
+                    result = func(*self._current_params, cancel_token=token)
+                else:
+                    result = func(*self._current_params)
+                if isinstance(result, tuple):
+                    display_text = result[0]
+                    self._current_params = list(result[1:])
+                else:
+                    display_text = str(result)
+                    self._current_params = []
+                    
+                # 发送结果
+                self.result_ready.emit(display_text)
+                if token._deadline is not None and token.timed_out:
+                    raise StepTimeout(f"步骤执行超过{timeout}秒")
+                
+                # 更新索引
+                self._current_index += 1
+                if self._current_index >= len(self.functions):
+                    if self.loop:
+                        self._current_index = 0
+                    else:
+                        break
+                        
+            except Exception as e:
+                if not self._is_running:
+                    break  # 停止时被取消的步骤不再报错
+                if isinstance(e, StepTimeout) or (token._deadline is not None and token.timed_out):
+                    # 超时的步骤状态未知，重新执行会重复其副作用，后续步骤也缺少参数，直接停止
+                    self.result_ready.emit(f"Error: {e if isinstance(e, StepTimeout) else '步骤执行超时'}，已停止运行")
+                    self._is_running = False
+                    break
+                self.result_ready.emit(f"Error: {str(e)}")
+                self._current_params = []
+                
+        self.finished.emit()
+
+    def stop(self):
+        """请求停止并取消当前步骤，不等待线程结束"""
+        self._is_running = False
+        self._token.cancel()
+        self._resumed.set()
+        
+    def pause(self):
+        """当前步骤结束后暂停"""
+        self._resumed.clear()
+        
+    def resume(self):
+        self._resumed.set()
+        
+    def is_paused(self):
+        return not self._resumed.is_set()
+
+    def is_stopping(self):
+        return not self._is_running and self.isRunning()
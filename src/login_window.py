@@ -8,71 +8,223 @@ import json
 import os
 import webbrowser
 import subprocess
-import urllib.request
 import time
+from api_errors import ErrorClass
+from api_worker import ApiWorker
+from delta_patch import PatchError, apply_patch
+from download_engine import DownloadCancelled, DownloadEngine
+from session_store import SessionStore
+from update_cache import UpdateCache, split_expected_hash
+from user_info import UserInfoService
+
+# 登录时预取的数据，通过login_info['prefetched']传给主窗口
+PREFETCH_KEYS = ('user_info', 'announcement')
+# 更新检查结果的默认缓存时间（秒）；只缓存发现新版本的结果，未发现时每次启动都重新检查
+UPDATE_CHECK_TTL = 10 * 60
+
 
 class DownloadThread(QThread):
-    """下载线程"""
+    """下载线程：分段并行下载，支持断点续传"""
     progress_updated = pyqtSignal(int, float)  # 进度百分比, 下载速度
     finished = pyqtSignal(str)  # 下载完成信号，传递保存路径
     error = pyqtSignal(str)  # 错误信号
 
-    def __init__(self, url, save_path):
+    def __init__(self, url, save_path, segments=4, expected_sha256=None, cache=None, version=None,
+                 base_path=None, base_version=None, max_rate=None):
+        """
+        :param expected_sha256: 预期的SHA-256，下载过程中增量校验
+        :param cache: UpdateCache，下载完成后移入缓存
+        :param version: 写入缓存索引的版本号
+        :param base_path: 缓存中当前版本的安装包，与base_version都提供时先尝试下载 <url>.<base_version>.patch 增量更新
+        :param max_rate: 限速（字节/秒），None表示不限
+        """
         super().__init__()
         self.url = url
         self.save_path = save_path
+        self.expected_sha256 = expected_sha256
+        self.cache = cache
+        self.version = version
+        self.base_path = base_path
+        self.base_version = base_version
+        # 引擎按固定间隔回调进度，这里只在显示内容变化时发信号
+        self.engine = DownloadEngine(url, save_path, segments=segments, progress=self.on_progress,
+                                     expected_sha256=expected_sha256, max_rate=max_rate)
+        # 只有缓存中有当前版本的安装包时才尝试增量更新
+        self.patch_engine = None
+        if base_path and base_version:
+            self.patch_engine = DownloadEngine(f"{url}.{base_version}.patch", save_path + ".patch",
+                                               progress=self.on_progress, max_rate=max_rate)
+        self.engines = [engine for engine in (self.patch_engine, self.engine) if engine is not None]
+        self.last_emitted = None
 
     def run(self):
         try:
-            req = urllib.request.Request(self.url)
-            req.add_header('User-Agent', 'Mozilla/5.0')
-            with urllib.request.urlopen(req) as response:
-                file_size = int(response.headers['Content-Length'])
-                downloaded_size = 0
-                start_time = time.time()
-                last_update_time = start_time
-                last_downloaded = 0
-                speed_buffer = []  # 用于存储1秒内的下载量
-
-                with open(self.save_path, 'wb') as out_file:
-                    while True:
-                        chunk = response.read(8192)
-                        if not chunk:
-                            break
-                        out_file.write(chunk)
-                        downloaded_size += len(chunk)
-
-                        # 记录当前下载量
-                        current_time = time.time()
-                        speed_buffer.append((current_time, len(chunk)))
-
-                        # 移除超过1秒的数据
-                        while speed_buffer and current_time - speed_buffer[0][0] > 1:
-                            speed_buffer.pop(0)
-
-                        # 计算1秒内的总下载量并转换为Mbps
-                        total_bytes = sum(size for (_, size) in speed_buffer)
-                        speed_mbps = (total_bytes * 8) / (1024 * 1024)  # 转换为Mbps
-
-                        # 计算进度
-                        progress = int((downloaded_size / file_size) * 100)
-
-                        # 发射信号
-                        self.progress_updated.emit(progress, speed_mbps)
-
-            self.finished.emit(self.save_path)
+            sha256 = self.apply_delta() if self.patch_engine is not None else None
+            if sha256 is None:
+                path = self.engine.run()
+                sha256 = self.engine.sha256
+            else:
+                path = self.save_path
+            if self.cache is not None:
+                path = self.cache.store(self.url, path, sha256, self.version)
+            self.finished.emit(path)
         except Exception as e:
             self.error.emit(str(e))
 
+    def apply_delta(self):
+        """
+        下载当前版本到新版本的补丁并应用到当前版本的安装包
+        :return: 新安装包的SHA-256，失败返回None（改为下载完整安装包）
+        """
+        patch_path = self.patch_engine.save_path
+        try:
+            self.patch_engine.run()
+            sha256 = apply_patch(self.base_path, patch_path, self.save_path)
+            if self.expected_sha256 and sha256 != self.expected_sha256:
+                raise PatchError("补丁生成的安装包与预期的SHA-256不一致")
+            print(f"增量更新完成，补丁 {self.patch_engine.size} 字节")
+            return sha256
+        except DownloadCancelled:
+            raise
+        except Exception as e:
+            print(f"增量更新失败，改为下载完整安装包: {e}")
+            if os.path.exists(self.save_path):
+                os.remove(self.save_path)
+            # 补丁不可用，不保留未完成的补丁和进度
+            self.patch_engine.discard()
+            return None
+        finally:
+            if os.path.exists(patch_path):
+                os.remove(patch_path)
+
+    def cancel(self):
+        """取消下载，已下载部分下次继续"""
+        for engine in self.engines:
+            engine.cancel()
+
+    def pause(self):
+        for engine in self.engines:
+            engine.pause()
+
+    def resume(self):
+        for engine in self.engines:
+            engine.resume()
+
+    def set_max_rate(self, max_rate):
+        """调整限速（字节/秒），None表示不限"""
+        for engine in self.engines:
+            engine.set_max_rate(max_rate)
+
+    def on_progress(self, downloaded, total, rate):
+        # 计算进度，未知文件大小时显示0
+        progress = int(downloaded * 100 / total) if total else 0
+        speed_mbps = round(rate * 8 / (1024 * 1024), 1)  # 转换为Mbps
+        if (progress, speed_mbps) != self.last_emitted:
+            self.last_emitted = (progress, speed_mbps)
+            self.progress_updated.emit(progress, speed_mbps)
+
+
+class UpdateCheckThread(QThread):
+    """
+    后台检查更新，发现新版本的结果在磁盘缓存ttl秒，期间重复启动不再请求网络；
+    ttl为0时不使用缓存。未发现新版本的结果不缓存，以免新版本发布后仍被旧结果挡住
+    """
+    checked = pyqtSignal(dict)  # 检查结果：latest_version, download_url, error
+
+    def __init__(self, api_client, cache_path='update_check.json', ttl=UPDATE_CHECK_TTL):
+        super().__init__()
+        self.api_client = api_client
+        self.cache_path = cache_path
+        self.ttl = ttl
+
+    def run(self):
+        result = self.load_cache()
+        if result is None:
+            result = self.fetch()
+            if self.ttl and not result['error'] and self.has_update(result):
+                self.save_cache(result)
+        self.checked.emit(result)
+
+    def fetch(self):
+        result = {'latest_version': None, 'download_url': None, 'error': None}
+        try:
+            # 并发获取最新版本号和下载地址
+            version_result, url_result = self.api_client.call_many([
+                "get_latest_version",
+                "get_download_url",
+            ])
+            success, latest_version, _ = version_result
+            if not success:
+                result['error'] = latest_version  # 显示错误信息
+                return result
+            result['latest_version'] = latest_version
+            if latest_version > self.api_client.version:
+                success, download_url, _ = url_result
+                if not success:
+                    result['error'] = download_url  # 显示错误信息
+                    return result
+                result['download_url'] = download_url
+        except Exception as e:
+            result['error'] = f"检查更新失败: {str(e)}"
+        return result
+
+    def has_update(self, result):
+        latest_version = result.get('latest_version')
+        return bool(latest_version) and latest_version > self.api_client.version
+
+    def cache_key(self):
+        # 软件升级后旧的检查结果不再适用
+        return f"{self.api_client.soft_id}|{self.api_client.version}"
+
+    def load_cache(self):
+        if not self.ttl:
+            return None
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cached.get('key') != self.cache_key() or time.time() - cached.get('checked_at', 0) > self.ttl:
+            return None
+        result = cached.get('result')
+        # 旧版本程序缓存的“已是最新版本”结果同样不采用
+        if not isinstance(result, dict) or not self.has_update(result):
+            return None
+        return result
+
+    def save_cache(self, result):
+        try:
+            with open(self.cache_path, 'w', encoding='utf-8') as f:
+                json.dump({'key': self.cache_key(), 'checked_at': time.time(), 'result': result}, f)
+        except OSError as e:
+            print(f'保存更新检查结果失败: {e}')
+
+
 class LoginWindow(QWidget):
-    def __init__(self,api_client, window_name = "登录",title_label= '测试软件1',windowicon = 'loog.png',on_login_success=None):
+    def __init__(self,api_client, window_name = "登录",title_label= '测试软件1',windowicon = 'loog.png',on_login_success=None,
+                 prefetch_update=False, prefetch_update_rate=512 * 1024, update_check_ttl=UPDATE_CHECK_TTL):
+        """
+        :param prefetch_update: 发现新版本后是否在后台预先下载
+        :param prefetch_update_rate: 后台预下载的限速（字节/秒）
+        :param update_check_ttl: 更新检查结果的缓存时间（秒），0表示每次启动都重新检查
+        """
         super().__init__()
+        self.prefetch_update = prefetch_update
+        self.prefetch_update_rate = prefetch_update_rate
+        self.update_check_ttl = update_check_ttl
+        self.download_thread = None
+        self.download_in_background = False
         self.window_name = window_name
         self.windowicon = windowicon
         self.title_label = title_label
         self.api_client = api_client
         self.on_login_success = on_login_success
         self.is_initializing = True  # 添加初始化标志
+        self.session_store = SessionStore()  # 自动登录时复用上次的Token
+        self.api_worker = ApiWorker(self)  # 接口调用在线程池中执行，不阻塞界面
+        self.user_info_service = UserInfoService(api_client)
+        self.update_cache = UpdateCache()  # 已下载的安装包
+        self.latest_version = None
         self.init_ui()
 
     def init_ui(self):
@@ -283,7 +435,7 @@ class LoginWindow(QWidget):
 
         self.update_tab.setLayout(layout)
 
-        # 初始化检查更新
+        # 后台检查更新，不阻塞窗口显示
         self.check_update()
 
     def handle_auto_login_change(self, state):
@@ -295,6 +447,8 @@ class LoginWindow(QWidget):
             self.auto_login_checkbox.setChecked(False)
 
     def handle_username_login(self):
+        if self.api_worker.is_busy('login'):
+            return  # 上一次登录尚未完成，避免重复提交
         username = self.username_input.text()
         password = self.password_input.text()
         remember = self.remember_checkbox.isChecked()
@@ -307,39 +461,71 @@ class LoginWindow(QWidget):
         # 保存登录信息
         self.save_login_info(username, password, remember, auto_login)
 
-        try:
-            # 调用API进行登录验证
-            success, result = self.api_client.user_login(
-                user_name=username,
-                password=password
-            )
-
-            if success:
-                # 检查用户权限
-                permission_result = self.api_client.check_user_status(
-                    user_name=username,
-                    token=result
-                )
-
-                if permission_result[0]:
-                    self.show_message('成功', '登录成功')
-                    self.close()
-                    if self.on_login_success:
-                        login_info = {
-                            'username': username,
-                            'password': password,
-                            'token': result,
-                            'login_type': 'password'
-                        }
-                        self.on_login_success(login_info)
-                else:
-                    self.show_message('错误', '权限验证失败')
-            else:
-                self.show_message('错误', result)
-        except Exception as e:
-            self.show_message('错误', f'登录异常: {str(e)}')
+        self.submit_login(
+            self.username_login_task, username, password,
+            on_result=self.on_username_login,
+            on_error=lambda error: self.show_message('错误', f'登录异常: {error}')
+        )
+
+    def username_login_task(self, username, password):
+        """在线程池中执行：登录后检查用户权限，同时预取主窗口需要的数据"""
+        success, result = self.api_client.user_login(
+            user_name=username,
+            password=password
+        )
+        if not success:
+            return username, password, success, result, None, []
+        permission_result, *prefetched = self.api_client.call_many(
+            [("check_user_status", (username, result))] + self.prefetch_calls(username, password)
+        )
+        return username, password, success, result, permission_result, prefetched
+
+    def on_username_login(self, login_result):
+        username, password, success, result, permission_result, prefetched = login_result
+        if not success:
+            self.show_message('错误', result)
+            return
+        if not permission_result[0]:
+            self.show_message('错误', '权限验证失败')
+            return
+
+        self.session_store.save(self.api_client.soft_id, username, self.api_client.mac, result)
+        self.show_message('成功', '登录成功')
+        self.finish_login({
+            'username': username,
+            'password': password,
+            'token': result,
+            'login_type': 'password',
+            'prefetched': dict(zip(PREFETCH_KEYS, prefetched))
+        })
+
+    def submit_login(self, fn, *args, on_result, on_error, **kwargs):
+        """提交登录请求，请求期间暂停后台预下载"""
+        def deliver(callback):
+            def wrapper(value):
+                self.resume_background_download()
+                callback(value)
+            return wrapper
+
+        self.pause_background_download()
+        self.api_worker.submit('login', fn, *args, on_result=deliver(on_result), on_error=deliver(on_error), **kwargs)
+
+    def finish_login(self, login_info):
+        """关闭登录窗口并通知登录成功"""
+        self.close()
+        if self.on_login_success:
+            self.on_login_success(login_info)
+
+    def prefetch_calls(self, username, password):
+        """主窗口打开时需要的数据，与PREFETCH_KEYS一一对应"""
+        return [
+            (self.user_info_service.fetch, (username, password)),
+            "get_announcement",
+        ]
 
     def handle_code_login(self):
+        if self.api_worker.is_busy('login'):
+            return  # 上一次登录尚未完成，避免重复提交
         code = self.code_input.text()
         remember = self.code_remember_checkbox.isChecked()
         auto_login = self.code_auto_login_checkbox.isChecked()
@@ -348,30 +534,39 @@ class LoginWindow(QWidget):
             self.show_message('错误', '单码不能为空')
             return
 
-        try:
-            # 调用API进行单码登录
-            success, result = self.api_client.single_code_login(
-                card=code
-            )
-
-            if success:
-                # 保存登录信息
-                self.save_login_info(code, '', remember, auto_login, login_type='code')
-                
-                self.show_message('成功', '单码登录成功')
-                self.close()
-                if self.on_login_success:
-                    login_info = {
-                        'username': code,
-                        'password': '',
-                        'token': result,
-                        'login_type': 'code'
-                    }
-                    self.on_login_success(login_info)
-            else:
-                self.show_message('错误', result)
-        except Exception as e:
-            self.show_message('错误', f'单码登录异常: {str(e)}')
+        self.submit_login(
+            self.code_login_task, code,
+            on_result=lambda login_result: self.on_code_login(login_result, remember, auto_login),
+            on_error=lambda error: self.show_message('错误', f'单码登录异常: {error}')
+        )
+
+    def code_login_task(self, code):
+        """在线程池中执行：单码登录并预取主窗口需要的数据"""
+        success, result = self.api_client.single_code_login(
+            card=code
+        )
+        if not success:
+            return code, success, result, []
+        return code, success, result, self.api_client.call_many(self.prefetch_calls(code, ''))
+
+    def on_code_login(self, login_result, remember, auto_login):
+        code, success, result, prefetched = login_result
+        if not success:
+            self.show_message('错误', result)
+            return
+
+        # 保存登录信息
+        self.save_login_info(code, '', remember, auto_login, login_type='code')
+        self.session_store.save(self.api_client.soft_id, code, self.api_client.mac, result)
+
+        self.show_message('成功', '单码登录成功')
+        self.finish_login({
+            'username': code,
+            'password': '',
+            'token': result,
+            'login_type': 'code',
+            'prefetched': dict(zip(PREFETCH_KEYS, prefetched))
+        })
 
     def handle_register(self):
         username = self.register_username_input.text()
@@ -390,30 +585,31 @@ class LoginWindow(QWidget):
         # 显示加载状态
         self.show_loading(True)
 
-        try:
-            # 调用API注册
-            success, result = self.api_client.user_register(
-                user_name=username,
-                password=password,
-                super_pwd=password,
-                card_pwd='',
-            )
-
-            if success:
-                self.show_message('成功', '注册成功')
-                # 清空输入框
-                self.register_username_input.clear()
-                self.register_password_input.clear()
-                self.register_confirm_password_input.clear()
-                # 跳转到用户名登录页面
-                self.tabs.setCurrentIndex(0)
-                self.username_input.setText(username)
-            else:
-                self.show_message('错误', result)
-        except Exception as e:
-            self.show_message('错误', f'注册异常: {str(e)}')
-        finally:
-            self.show_loading(False)
+        # 调用API注册
+        self.api_worker.submit(
+            'register', self.api_client.user_register,
+            user_name=username,
+            password=password,
+            super_pwd=password,
+            card_pwd='',
+            on_result=lambda register_result: self.on_register(register_result, username),
+            on_error=lambda error: self.on_action_error(f'注册异常: {error}')
+        )
+
+    def on_register(self, register_result, username):
+        self.show_loading(False)
+        success, result = register_result
+        if success:
+            self.show_message('成功', '注册成功')
+            # 清空输入框
+            self.register_username_input.clear()
+            self.register_password_input.clear()
+            self.register_confirm_password_input.clear()
+            # 跳转到用户名登录页面
+            self.tabs.setCurrentIndex(0)
+            self.username_input.setText(username)
+        else:
+            self.show_message('错误', result)
 
     def handle_recharge(self):
         username = self.recharge_username_input.text()
@@ -426,25 +622,30 @@ class LoginWindow(QWidget):
         # 显示加载状态
         self.show_loading(True)
 
-        try:
-            # 调用API充值
-            success, result = self.api_client.user_recharge(
-                user_name=username,
-                card_pwd=code
-            )
-
-            if success:
-                self.show_message('成功', '充值成功')
-                # 清空输入框
-                self.recharge_code_input.clear()
-                # 跳转到用户名登录页面
-                self.tabs.setCurrentIndex(0)
-            else:
-                self.show_message('错误', result)
-        except Exception as e:
-            self.show_message('错误', f'充值异常: {str(e)}')
-        finally:
-            self.show_loading(False)
+        # 调用API充值
+        self.api_worker.submit(
+            'recharge', self.api_client.user_recharge,
+            user_name=username,
+            card_pwd=code,
+            on_result=self.on_recharge,
+            on_error=lambda error: self.on_action_error(f'充值异常: {error}')
+        )
+
+    def on_recharge(self, recharge_result):
+        self.show_loading(False)
+        success, result = recharge_result
+        if success:
+            self.show_message('成功', '充值成功')
+            # 清空输入框
+            self.recharge_code_input.clear()
+            # 跳转到用户名登录页面
+            self.tabs.setCurrentIndex(0)
+        else:
+            self.show_message('错误', result)
+
+    def on_action_error(self, message):
+        self.show_loading(False)
+        self.show_message('错误', message)
 
     def load_saved_login(self):
         """加载保存的登录信息"""
@@ -527,40 +728,72 @@ class LoginWindow(QWidget):
                 self.loading_dialog.close()
 
     def check_auto_login(self):
-        """检查并执行自动登录"""
+        """检查并执行自动登录，优先复用上次的Token"""
         if self.auto_login_checkbox.isChecked():
             # 用户名自动登录
             self.tabs.setCurrentIndex(0)  # 切换到用户名登录页
-            self.handle_username_login()
+            self.resume_session(self.username_input.text(), self.password_input.text(), 'password',
+                                fallback=self.handle_username_login)
         elif self.code_auto_login_checkbox.isChecked():
             # 单码自动登录
             self.tabs.setCurrentIndex(1)  # 切换到单码登录页
-            self.handle_code_login()
+            self.resume_session(self.code_input.text(), '', 'code', fallback=self.handle_code_login)
+
+    def resume_session(self, username, password, login_type, fallback):
+        """
+        用保存的Token恢复会话：只做一次状态检测，成功则跳过登录，否则执行fallback走正常登录流程
+        """
+        if not username or (login_type == 'password' and not password):
+            fallback()
+            return
+        soft_id, mac = self.api_client.soft_id, self.api_client.mac
+        token = self.session_store.load(soft_id, username, mac)
+        if not token:
+            fallback()
+            return
 
-    def check_update(self):
-        """检查更新"""
-        try:
-            # 获取最新版本号
-            success, latest_version = self.api_client.get_latest_version()
-            if not success:
-                self.update_label.setText(latest_version)  # 显示错误信息
+        def on_status(status):
+            success, result = status
+            if success and result == "1":
+                self.finish_login({
+                    'username': username,
+                    'password': password,
+                    'token': token,
+                    'login_type': login_type
+                })
                 return
-                
-            if latest_version > self.api_client.version:
-                # 获取下载地址
-                success, download_url = self.api_client.get_download_url()
-                if not success:
-                    self.update_label.setText(download_url)  # 显示错误信息
-                    return
-                    
-                self.download_url = download_url
-                self.update_label.setText(f"发现新版本 {latest_version}\n下载地址：{self.download_url}")
-                self.download_btn.setEnabled(True)
-                self.update_btn.setEnabled(True)
-            else:
-                self.update_label.setText("当前已是最新版本，无需更新。")
-        except Exception as e:
-            self.update_label.setText(f"检查更新失败: {str(e)}")
+            # 网络或限流等暂时性失败保留Token，否则视为已失效
+            if getattr(status, 'error_class', None) not in (ErrorClass.UNAVAILABLE, ErrorClass.THROTTLED):
+                self.session_store.remove(soft_id, username, mac)
+            fallback()
+
+        def on_error(error):
+            print(f'恢复会话失败: {error}')
+            fallback()
+
+        self.submit_login(self.api_client.check_user_status, user_name=username, token=token,
+                          on_result=on_status, on_error=on_error)
+
+    def check_update(self):
+        """启动后台更新检查，完成后填充更新页"""
+        self.update_check_thread = UpdateCheckThread(self.api_client, ttl=self.update_check_ttl)
+        self.update_check_thread.checked.connect(self.on_update_checked)
+        self.update_check_thread.start()
+
+    def on_update_checked(self, result):
+        """更新检查完成"""
+        if result['error']:
+            self.update_label.setText(result['error'])
+        elif result['download_url']:
+            self.download_url = result['download_url']
+            self.latest_version = result['latest_version']
+            self.update_label.setText(f"发现新版本 {result['latest_version']}\n下载地址：{self.download_url}")
+            self.download_btn.setEnabled(True)
+            self.update_btn.setEnabled(True)
+            if self.prefetch_update:
+                self.start_update_download(background=True)
+        else:
+            self.update_label.setText("当前已是最新版本，无需更新。")
 
     def handle_download(self):
         """处理下载按钮点击"""
@@ -568,20 +801,59 @@ class LoginWindow(QWidget):
 
     def handle_update(self):
         """处理更新按钮点击"""
+        if self.download_in_background and self.download_thread is not None and self.download_thread.isRunning():
+            # 后台预下载转为前台：取消限速并显示进度
+            self.download_in_background = False
+            self.download_thread.set_max_rate(None)
+            self.download_thread.resume()
+            self.download_thread.progress_updated.connect(self.update_progress)
+            self.download_btn.setEnabled(False)
+            self.update_btn.setEnabled(False)
+            return
+        self.start_update_download()
+
+    def start_update_download(self, background=False):
+        """
+        下载更新
+        :param background: 后台预下载：限速、低优先级、不显示进度，完成后点击更新直接使用
+        """
         try:
+            # 下载地址可带 #sha256=... 指定安装包的哈希
+            url, expected_sha256 = split_expected_hash(self.download_url)
+
+            # 已下载并校验过的安装包直接使用
+            cached_path = self.update_cache.lookup(url, expected_sha256, self.latest_version)
+            if cached_path:
+                if not background:
+                    self.update_progress_bar.setValue(100)
+                    self.on_download_finished(cached_path)
+                return
+
             # 创建update目录
             update_dir = os.path.join(os.getcwd(), "update")
             os.makedirs(update_dir, exist_ok=True)
             
             # 从URL中提取文件名
-            filename = os.path.basename(self.download_url)
+            filename = os.path.basename(url)
             save_path = os.path.join(update_dir, filename)
             
             # 创建下载线程
-            self.download_thread = DownloadThread(self.download_url, save_path)
+            # 缓存中有当前版本的安装包时先尝试增量更新
+            self.download_thread = DownloadThread(url, save_path, expected_sha256=expected_sha256,
+                                                  segments=2 if background else 4,
+                                                  cache=self.update_cache, version=self.latest_version,
+                                                  base_path=self.update_cache.find_version(self.api_client.version),
+                                                  base_version=self.api_client.version,
+                                                  max_rate=self.prefetch_update_rate if background else None)
+            self.download_thread.finished.connect(self.on_update_downloaded)
+            self.download_thread.error.connect(self.on_update_download_error)
+            self.download_in_background = background
+
+            if background:
+                self.download_thread.start(QThread.LowestPriority)
+                return
+
             self.download_thread.progress_updated.connect(self.update_progress)
-            self.download_thread.finished.connect(self.on_download_finished)
-            self.download_thread.error.connect(self.on_download_error)
             
             # 禁用按钮
             self.download_btn.setEnabled(False)
@@ -591,7 +863,42 @@ class LoginWindow(QWidget):
             self.download_thread.start()
             
         except Exception as e:
-            self.show_message("更新失败", f"初始化更新失败：\n{str(e)}")
+            if background:
+                print(f"后台预下载更新失败: {e}")
+            else:
+                self.show_message("更新失败", f"初始化更新失败：\n{str(e)}")
+
+    def on_update_downloaded(self, save_path):
+        if self.download_in_background:
+            # 预下载完成，等待用户点击更新
+            self.download_in_background = False
+            print(f"更新已在后台下载完成: {save_path}")
+            self.update_progress_bar.setValue(100)
+            return
+        self.on_download_finished(save_path)
+
+    def on_update_download_error(self, error_msg):
+        if self.download_in_background:
+            # 预下载失败不打扰用户，点击更新时从断点继续
+            self.download_in_background = False
+            print(f"后台预下载更新失败: {error_msg}")
+            return
+        self.on_download_error(error_msg)
+
+    def pause_background_download(self):
+        """登录等请求进行时暂停预下载，避免在慢速网络上争抢带宽"""
+        if self.download_in_background and self.download_thread is not None:
+            self.download_thread.pause()
+
+    def resume_background_download(self):
+        if self.download_thread is not None:
+            self.download_thread.resume()
+
+    def stop_downloads(self):
+        """退出前停止下载线程，已下载的部分下次继续"""
+        if self.download_thread is not None and self.download_thread.isRunning():
+            self.download_thread.cancel()
+            self.download_thread.wait()
 
     def update_progress(self, progress, speed):
         """更新下载进度"""
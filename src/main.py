@@ -58,9 +58,13 @@ def function9(*params):
     value += 1
     return str(value), value
 
-def function10(*params):
+def function10(*params, cancel_token=None):
+    # 声明cancel_token参数的函数会收到取消令牌：用cancel_token.wait代替time.sleep，停止时立即返回
     value = params[0]
-    time.sleep(1)
+    if cancel_token is None:
+        time.sleep(1)  # 直接调用时没有令牌
+    elif cancel_token.wait(1):
+        return "已取消", value
     value += 1
     return str(value), value
 
@@ -120,7 +124,11 @@ window_config = {
 feature_config = {
     'functions': functions,
     'param_definitions': PARAM_DEFINITIONS,# 配置窗口的配置设置
-    'if_main_window': True# 是否需要显示主界面
+    'if_main_window': True,# 是否需要显示主界面
+    # 'prefetch_update': True,# 发现新版本后在后台限速预下载，点击更新时直接使用
+    # 'prefetch_update_rate': 512 * 1024,# 预下载限速（字节/秒）
+    # 'update_check_ttl': 600,# 发现新版本的检查结果缓存时间（秒），0表示每次启动都检查
+    # 'step_timeout': 60,# 每个函数的超时（秒），超时后停止运行；函数的timeout属性可单独指定
 }
 
 
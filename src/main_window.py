@@ -1,70 +1,14 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QLabel, QPushButton,
                             QTextEdit, QMessageBox, QCheckBox, QDialog,QHBoxLayout)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer,QUrl
-import time
+from PyQt5.QtCore import Qt, QTimer,QUrl
 from PyQt5.QtGui import QIcon
 from PyQt5.QtMultimedia import QSoundEffect
-from typing import List, Callable, Dict, Tuple
+from typing import List, Callable, Dict, Optional, Tuple
 from config_window import ConfigWindow
-
-class FunctionRunner(QThread):
-    finished = pyqtSignal()
-    result_ready = pyqtSignal(str)
-
-    def __init__(self, functions: List[Callable], loop: bool = True):
-        super().__init__()
-        self.functions = functions
-        self.loop = loop
-        self._is_running = True
-        self._is_paused = False
-        self._current_index = 0
-        self._current_params = []
-
-    def run(self):
-        while self._is_running:
-            if self._is_paused:
-                time.sleep(0.1)
-                continue
-                
-            func = self.functions[self._current_index]
-            try:
-                # 执行函数并获取结果
-                result = func(*self._current_params)
-                if isinstance(result, tuple):
-                    display_text = result[0]
-                    self._current_params = list(result[1:])
-                else:
-                    display_text = str(result)
-                    self._current_params = []
-                    
-                # 发送结果
-                self.result_ready.emit(display_text)
-                
-                # 更新索引
-                self._current_index += 1
-                if self._current_index >= len(self.functions):
-                    if self.loop:
-                        self._current_index = 0
-                    else:
-                        break
-                        
-            except Exception as e:
-                self.result_ready.emit(f"Error: {str(e)}")
-                self._current_params = []
-                
-        self.finished.emit()
-
-    def stop(self):
-        self._is_running = False
-        
-    def pause(self):
-        self._is_paused = True
-        
-    def resume(self):
-        self._is_paused = False
-        
-    def is_paused(self):
-        return self._is_paused
+from function_runner import FunctionRunner
+from api_errors import ErrorClass
+from api_worker import ApiWorker
+from user_info import UserInfoService
 
 class AnnouncementDialog(QDialog):
     def __init__(self, content,windowicon = 'loog.png'):
@@ -120,8 +64,10 @@ class AnnouncementDialog(QDialog):
         super().closeEvent(event)
 
 class MainWindow(QWidget):
-    def __init__(self, login_info: Dict, functions: List[Callable], param_definitions, api_client,window_name= '主窗口',windowicon='loog.png'):
+    def __init__(self, login_info: Dict, functions: List[Callable], param_definitions, api_client,window_name= '主窗口',windowicon='loog.png',
+                 step_timeout: Optional[float] = None):
         super().__init__()
+        self.step_timeout = step_timeout
         self.window_name = window_name
         self.windowicon = windowicon
         self.login_info = login_info
@@ -131,6 +77,10 @@ class MainWindow(QWidget):
         self.status_timer = None
         self.announce_timer = None
         self.cached_announcement = ""
+        self.api_worker = ApiWorker(self)  # 接口调用在线程池中执行，不阻塞界面
+        self.user_info_service = UserInfoService(api_client)
+        # 登录时预取的用户信息和公告，首次显示时直接使用
+        self.prefetched = dict(login_info.get('prefetched') or {})
         self.init_ui()
         self.param_definitions = param_definitions
         self.start_status_check()
@@ -139,30 +89,33 @@ class MainWindow(QWidget):
 
     def update_user_info(self):
         """更新用户到期时间和剩余点数"""
-        try:
-            # 获取到期时间
-            success, expiry_time = self.api_client.get_expiry_time(
-                self.login_info['username'],
-                self.login_info['password']
-            )
-            if success:
-                self.expiry_label.setText(f"到期时间：{expiry_time}")
-            else:
-                self.expiry_label.setText(f"到期时间：获取失败 ({expiry_time})")
+        prefetched = self.prefetched.pop('user_info', None)
+        if prefetched is not None and prefetched.success:
+            self.show_user_info(prefetched[:2])
+            return
+        self.api_worker.submit(
+            'user_info', self.user_info_service.fetch,
+            self.login_info['username'], self.login_info['password'],
+            on_result=self.show_user_info,
+            on_error=self.on_user_info_error
+        )
+
+    def show_user_info(self, result):
+        _, info = result
+        if info.expiry_time is not None:
+            self.expiry_label.setText(f"到期时间：{info.expiry_time}")
+        else:
+            self.expiry_label.setText(f"到期时间：获取失败 ({info.expiry_error})")
 
-            # 获取剩余点数
-            success, points = self.api_client.get_remaining_points(
-                self.login_info['username'],
-                self.login_info['password']
-            )
-            if success:
-                self.points_label.setText(f"剩余点数：{points}")
-            else:
-                self.points_label.setText(f"剩余点数：获取失败 ({points})")
-        except Exception as e:
-            self.expiry_label.setText("到期时间：获取异常")
-            self.points_label.setText("剩余点数：获取异常")
-            print(f"更新用户信息失败: {str(e)}")
+        if info.points is not None:
+            self.points_label.setText(f"剩余点数：{info.points}")
+        else:
+            self.points_label.setText(f"剩余点数：获取失败 ({info.points_error})")
+
+    def on_user_info_error(self, error):
+        self.expiry_label.setText("到期时间：获取异常")
+        self.points_label.setText("剩余点数：获取异常")
+        print(f"更新用户信息失败: {error}")
 
     def init_ui(self):
         self.setWindowTitle(self.window_name)
@@ -256,11 +209,14 @@ class MainWindow(QWidget):
         self.config_window.exec_()
 
     def run_functions(self):
+        if self.function_runner is not None and self.function_runner.is_stopping():
+            return  # 等待上一次运行的当前步骤结束
         if not hasattr(self, 'function_runner') or self.function_runner is None or not self.function_runner.isRunning():
             self.result_display.clear()
             self.function_runner = FunctionRunner(
                 self.functions,
-                self.loop_checkbox.isChecked()
+                self.loop_checkbox.isChecked(),
+                timeout=self.step_timeout
             )
             self.function_runner.result_ready.connect(self.update_result)
             self.function_runner.finished.connect(self.on_finished)
@@ -277,24 +233,30 @@ class MainWindow(QWidget):
                 self.run_button.setText("继续")
 
     def stop_functions(self):
-        if self.function_runner:
+        """请求停止，不在界面线程等待；当前步骤结束后由on_finished恢复按钮"""
+        if self.function_runner and self.function_runner.isRunning():
             self.function_runner.stop()
-            self.function_runner.wait()
-            self.run_button.setText("运行")
-            self.run_button.setEnabled(True)
+            self.run_button.setText("停止中")
+            self.run_button.setEnabled(False)
             self.stop_button.setEnabled(False)
 
     def update_result(self, result: str):
         self.result_display.append(result)
 
     def on_finished(self):
+        self.run_button.setText("运行")
         self.run_button.setEnabled(True)
         self.stop_button.setEnabled(False)
 
     def closeEvent(self, event):
         self.stop_functions()
+        if self.function_runner is not None:
+            # 先隐藏窗口，再等待当前步骤结束，避免线程运行中被销毁
+            self.hide()
+            self.function_runner.wait()
         self.stop_status_check()
         self.stop_announce_check()
+        self.api_worker.cancel_all()
         event.accept()
 
     def start_status_check(self):
@@ -332,34 +294,42 @@ class MainWindow(QWidget):
         if not self.announce_checkbox.isChecked():
             return
 
-        try:
-            success, announcement = self.api_client.get_announcement()
-            print("检查公告更新")
-            if not success:
-                return
-            
-            
-            # 如果公告内容发生变化
-            if announcement and announcement != self.cached_announcement:
-                self.cached_announcement = announcement
-                # 强制显示公告窗口
-                self.show_announcement(announcement)
-        except Exception as e:
-            print(f"检查公告失败: {str(e)}")
+        self.api_worker.submit(
+            'announcement_check', self.api_client.get_announcement,
+            on_result=self.on_announcement_checked,
+            on_error=lambda error: print(f"检查公告失败: {error}")
+        )
+
+    def on_announcement_checked(self, result):
+        success, announcement = result
+        print("检查公告更新")
+        if not success:
+            return
+
+        # 如果公告内容发生变化
+        if announcement and announcement != self.cached_announcement:
+            self.cached_announcement = announcement
+            # 强制显示公告窗口
+            self.show_announcement(announcement)
 
     def show_announcement(self, content=None):
         """显示公告"""
+        # 如果未传入内容，则从API获取最新公告
+        if content is None or content is False:
+            prefetched = self.prefetched.pop('announcement', None)
+            if prefetched is None:
+                self.api_worker.submit(
+                    # 与定时检查使用不同的tag，二者不会互相取消
+                    'announcement_show', self.api_client.get_announcement,
+                    on_result=self.on_announcement_fetched,
+                    on_error=self.on_announcement_error
+                )
+                return
+            success, content, _ = prefetched
+            self.on_announcement_fetched((success, content))
+            return
+
         try:
-            # 如果未传入内容，则从API获取最新公告
-            if content is None or content is False:
-                success, content = self.api_client.get_announcement()
-                print("显示公告")
-                if not success:
-                    content = "获取公告失败，请稍后重试"
-                else:
-                    # 更新缓存
-                    self.cached_announcement = str(content) if content is not None else ""
-            
             # 确保内容为字符串
             content = str(content) if content is not None else "暂无公告"
             dialog = AnnouncementDialog(content=content,windowicon=self.windowicon)
@@ -367,44 +337,66 @@ class MainWindow(QWidget):
             dialog.finished.connect(lambda: self.setEnabled(True))
             dialog.exec_()
         except Exception as e:
-            print(f"显示公告失败: {str(e)}")
-            QMessageBox.warning(self, "错误", "无法显示公告，请检查网络连接")
+            self.on_announcement_error(str(e))
+
+    def on_announcement_fetched(self, result):
+        success, content = result
+        print("显示公告")
+        if not success:
+            content = "获取公告失败，请稍后重试"
+        else:
+            # 更新缓存
+            self.cached_announcement = str(content) if content is not None else ""
+        self.show_announcement(str(content) if content is not None else "暂无公告")
+
+    def on_announcement_error(self, error):
+        print(f"显示公告失败: {error}")
+        QMessageBox.warning(self, "错误", "无法显示公告，请检查网络连接")
 
     def check_user_status(self):
         """检查用户状态"""
-        try:
-            success, result = self.api_client.check_user_status(
-                self.login_info['username'],
-                self.login_info['token']
-            )
-            print(result)
-            if success and result == "1":
-                self.update_result(f"[状态检测] 账号状态正常")
-                # 更新用户信息
-                self.update_user_info()
-            else:
-                error_msg = result if not success else "未知错误"
-                self.update_result(f"[状态检测] 账号异常: {error_msg}")
-                # 停止所有功能
-                self.stop_functions()
-                # 停止状态检测
-                self.stop_status_check()
-                # 弹出警告窗口
-                reply = QMessageBox.critical(self, "账号异常",
-                    f"检测到账号异常: {error_msg}\n程序将关闭",
-                    QMessageBox.Ok)
-                if reply == QMessageBox.Ok:
-                    self.close()
-        except Exception as e:
-            self.update_result(f"[状态检测] 检测失败: {str(e)}")
+        self.api_worker.submit(
+            'status', self.api_client.check_user_status,
+            self.login_info['username'],
+            self.login_info['token'],
+            on_result=self.on_user_status,
+            on_error=self.on_user_status_error
+        )
+
+    def on_user_status(self, status):
+        success, result = status
+        print(result)
+        if success and result == "1":
+            self.update_result(f"[状态检测] 账号状态正常")
+            # 更新用户信息
+            self.update_user_info()
+        elif getattr(status, 'error_class', None) in (ErrorClass.UNAVAILABLE, ErrorClass.THROTTLED):
+            # 网络波动或访问过频不代表账号异常，等待下次检测
+            self.update_result(f"[状态检测] 暂时无法检测: {result}")
+        else:
+            error_msg = result if not success else "未知错误"
+            self.update_result(f"[状态检测] 账号异常: {error_msg}")
+            # 停止所有功能
             self.stop_functions()
+            # 停止状态检测
             self.stop_status_check()
-            reply = QMessageBox.critical(self, "检测失败",
-                f"状态检测失败: {str(e)}\n程序将关闭",
+            # 弹出警告窗口
+            reply = QMessageBox.critical(self, "账号异常",
+                f"检测到账号异常: {error_msg}\n程序将关闭",
                 QMessageBox.Ok)
             if reply == QMessageBox.Ok:
                 self.close()
 
+    def on_user_status_error(self, error):
+        self.update_result(f"[状态检测] 检测失败: {error}")
+        self.stop_functions()
+        self.stop_status_check()
+        reply = QMessageBox.critical(self, "检测失败",
+            f"状态检测失败: {error}\n程序将关闭",
+            QMessageBox.Ok)
+        if reply == QMessageBox.Ok:
+            self.close()
+
 if __name__ == '__main__':
     from PyQt5.QtWidgets import QApplication
     import sys
@@ -0,0 +1,123 @@
+import threading
+import time
+from typing import Dict, Hashable, Optional, Tuple
+
+
+class TokenBucket:
+    """令牌桶：容量为capacity，每period秒补满"""
+
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period  # 每秒补充的令牌数
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        # 令牌桶可能在调用方取得now之后才创建，不能倒扣令牌
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """距离获得一个令牌还需等待的秒数"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.tokens -= 1
+
+    def refund(self):
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+
+class RateGovernor:
+    """
+    客户端限流器：每个接口一个令牌桶，另有一个全局（同IP）令牌桶；
+    服务端返回频率类错误码后可对单个接口或全局施加冷却
+    """
+
+    def __init__(self, limits: Dict[Hashable, Tuple[int, float]],
+                 default_limit: Optional[Tuple[int, float]] = None,
+                 global_limit: Optional[Tuple[int, float]] = None,
+                 max_wait: float = 3.0):
+        """
+        :param limits: 接口 -> (容量, 周期秒数)
+        :param default_limit: 未在limits中配置的接口使用的限额，None表示不限
+        :param global_limit: 所有接口共享的限额，None表示不限
+        :param max_wait: 单次调用最多排队等待的秒数，超过则直接拒绝
+        """
+        self.limits = dict(limits)
+        self.default_limit = default_limit
+        self.max_wait = max_wait
+        self._buckets: Dict[Hashable, TokenBucket] = {}
+        self._global = TokenBucket(*global_limit) if global_limit else None
+        self._cooldowns: Dict[Hashable, float] = {}  # 接口 -> 冷却结束时间
+        self._global_cooldown = 0.0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, key: Hashable) -> float:
+        """
+        尝试为接口获取调用许可
+        :return: 0表示已获得许可，否则为需要等待的秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self._global_cooldown - now, self._cooldowns.get(key, 0.0) - now, 0.0)
+            bucket = self._get_bucket(key)
+            if bucket is not None:
+                wait = max(wait, bucket.wait_time(now))
+            if self._global is not None:
+                wait = max(wait, self._global.wait_time(now))
+            if wait > 0:
+                return wait
+            if bucket is not None:
+                bucket.consume()
+            if self._global is not None:
+                self._global.consume()
+            return 0.0
+
+    def acquire(self, key: Hashable) -> float:
+        """
+        获取调用许可，需等待时在max_wait内阻塞排队
+        :return: 0表示已获得许可，否则为仍需等待的秒数（调用应被拒绝）
+        """
+        while True:
+            wait = self.try_acquire(key)
+            if wait == 0 or wait > self.max_wait:
+                return wait
+            time.sleep(wait)
+
+    def refund(self, key: Hashable):
+        """归还一次已获得的许可，用于请求未到达服务端（网络错误等）的情况"""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.refund()
+            if self._global is not None:
+                self._global.refund()
+
+    def penalize(self, key: Optional[Hashable], seconds: float):
+        """服务端提示访问过频时施加冷却，key为None表示全局冷却"""
+        with self._lock:
+            until = time.monotonic() + seconds
+            if key is None:
+                self._global_cooldown = max(self._global_cooldown, until)
+            else:
+                self._cooldowns[key] = max(self._cooldowns.get(key, 0.0), until)
+
+    def reset(self, key: Hashable):
+        """清除接口的令牌桶和冷却状态，例如重新登录后状态检测间隔重新计算"""
+        with self._lock:
+            self._buckets.pop(key, None)
+            self._cooldowns.pop(key, None)
+
+    def _get_bucket(self, key: Hashable) -> Optional[TokenBucket]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            limit = self.limits.get(key, self.default_limit)
+            if limit is None:
+                return None
+            bucket = self._buckets[key] = TokenBucket(*limit)
+        return bucket
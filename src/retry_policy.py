@@ -0,0 +1,54 @@
+import random
+import threading
+
+
+class RetryPolicy:
+    """重试策略：指数退避加随机抖动，并限制单次调用的总时限"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.2,
+                 max_delay: float = 2.0, multiplier: float = 2.0,
+                 jitter: float = 0.5, deadline: float = 8.0):
+        """
+        :param max_attempts: 最多尝试次数（含首次）
+        :param base_delay: 首次重试前的等待秒数
+        :param max_delay: 单次等待的上限（秒）
+        :param multiplier: 每次重试等待时间的增长倍数
+        :param jitter: 随机抖动比例，0~1，实际等待在 [delay*(1-jitter), delay] 之间
+        :param deadline: 单次调用（含所有重试）的总时限（秒）
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.deadline = deadline
+
+    def backoff(self, attempt: int) -> float:
+        """第attempt次尝试失败后、下一次重试前的等待秒数"""
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        return delay * (1 - self.jitter * random.random())
+
+
+class RetryBudget:
+    """
+    重试预算：每个正常请求存入ratio个令牌，每次重试消耗1个，
+    避免服务端故障时重试放大流量（线程安全）
+    """
+
+    def __init__(self, ratio: float = 0.2, min_tokens: float = 3, max_tokens: float = 20):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = float(min_tokens)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """尝试消耗一次重试机会，预算不足返回False"""
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
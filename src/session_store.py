@@ -0,0 +1,59 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+
+class SessionStore:
+    """登录会话存储：按 (软件标识, 用户名, 机器码) 保存最近一次登录的Token及签发时间"""
+
+    def __init__(self, path: str = "session.json", max_age: float = 24 * 3600):
+        """
+        :param path: 存储文件路径
+        :param max_age: Token最长复用时间（秒），超过后不再尝试复用
+        """
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(soft_id: str, user_name: str, mac: str) -> str:
+        return f"{soft_id}|{user_name}|{mac}"
+
+    def load(self, soft_id: str, user_name: str, mac: str) -> Optional[str]:
+        """读取可复用的Token，不存在或已超过最长复用时间返回None"""
+        with self._lock:
+            session = self._read().get(self._key(soft_id, user_name, mac))
+        if not session or time.time() - session.get("issued_at", 0) > self.max_age:
+            return None
+        return session.get("token")
+
+    def save(self, soft_id: str, user_name: str, mac: str, token: str):
+        with self._lock:
+            sessions = self._read()
+            sessions[self._key(soft_id, user_name, mac)] = {"token": token, "issued_at": time.time()}
+            self._write(sessions)
+
+    def remove(self, soft_id: str, user_name: str, mac: str):
+        with self._lock:
+            sessions = self._read()
+            if sessions.pop(self._key(soft_id, user_name, mac), None) is not None:
+                self._write(sessions)
+
+    def _read(self) -> Dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write(self, sessions: Dict):
+        # 先写临时文件再替换，避免写入中断导致文件损坏
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(sessions, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"保存会话失败: {e}")
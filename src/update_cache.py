@@ -0,0 +1,131 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+SHA256_FRAGMENT = re.compile(r"(?:^|&)sha256=([0-9a-fA-F]{64})(?:&|$)")
+
+
+def split_expected_hash(url: str) -> Tuple[str, Optional[str]]:
+    """
+    从下载地址的片段中取出预期的SHA-256，例如 http://host/setup.exe#sha256=<64位十六进制>
+    :return: (去掉片段的地址, SHA-256或None)
+    """
+    base, _, fragment = url.partition("#")
+    match = SHA256_FRAGMENT.search(fragment)
+    return base, match.group(1).lower() if match else None
+
+
+class UpdateCache:
+    """
+    按内容寻址的安装包缓存：文件以SHA-256命名，索引记录下载地址、版本和最近使用时间，
+    总大小超过max_bytes时按最近最少使用淘汰旧版本
+    """
+
+    def __init__(self, directory: str = os.path.join("update", "cache"), max_bytes: int = 1024 * 1024 * 1024):
+        """
+        :param directory: 缓存目录
+        :param max_bytes: 缓存文件总大小上限（字节）
+        """
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.json")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def lookup(self, url: str, sha256: Optional[str] = None, version: Optional[str] = None) -> Optional[str]:
+        """
+        查找已下载且校验过的安装包
+        :param sha256: 预期的SHA-256，提供时只返回内容一致的文件（不论来自哪个地址）
+        :param version: 未提供sha256时按 (下载地址, 版本) 查找；下载地址通常固定不变，只按地址会把旧版本当作更新
+        :return: 缓存文件路径，未命中返回None
+        """
+        if not sha256 and version is None:
+            return None  # 无法确认是哪个版本
+        with self._lock:
+            index = self._read_index()
+            if sha256:
+                digest = sha256.lower()
+            else:
+                digest = next((d for d, entry in index.items()
+                               if entry["url"] == url and entry.get("version") == version), None)
+            entry = index.get(digest) if digest else None
+            if entry is None:
+                return None
+            path = os.path.join(self.directory, entry["file"])
+            try:
+                if os.path.getsize(path) != entry["size"]:
+                    raise OSError("大小不一致")
+            except OSError:
+                # 文件被删除或改动，移除索引
+                del index[digest]
+                self._write_index(index)
+                return None
+            entry["last_used"] = time.time()
+            self._write_index(index)
+            return path
+
+    def find_version(self, version: str) -> Optional[str]:
+        """查找指定版本的安装包，用作增量更新的基础文件"""
+        with self._lock:
+            index = self._read_index()
+        for entry in sorted(index.values(), key=lambda item: item["last_used"], reverse=True):
+            path = os.path.join(self.directory, entry["file"])
+            if entry.get("version") == version and os.path.isfile(path) and os.path.getsize(path) == entry["size"]:
+                return path
+        return None
+
+    def store(self, url: str, path: str, sha256: str, version: Optional[str] = None) -> str:
+        """
+        将下载完成并计算过哈希的文件移入缓存
+        :return: 缓存中的文件路径
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        digest = sha256.lower()
+        file_name = f"{digest[:16]}_{os.path.basename(path)}"
+        cached_path = os.path.join(self.directory, file_name)
+        with self._lock:
+            index = self._read_index()
+            shutil.move(path, cached_path)
+            index[digest] = {
+                "url": url,
+                "file": file_name,
+                "size": os.path.getsize(cached_path),
+                "version": version,
+                "last_used": time.time()
+            }
+            self._evict(index, keep=digest)
+            self._write_index(index)
+        return cached_path
+
+    def _evict(self, index: Dict, keep: str):
+        """按最近使用时间从旧到新删除，直到总大小不超过上限"""
+        total = sum(entry["size"] for entry in index.values())
+        for digest, entry in sorted(index.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if digest == keep:
+                continue
+            try:
+                os.remove(os.path.join(self.directory, entry["file"]))
+            except OSError:
+                pass
+            total -= entry["size"]
+            del index[digest]
+            print(f"淘汰旧版本安装包: {entry['file']}（版本 {entry.get('version')}）")
+
+    def _read_index(self) -> Dict:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self, index: Dict):
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(temp_path, self.index_path)
@@ -0,0 +1,133 @@
+import json
+from typing import Dict, Optional, Tuple, Union
+
+
+# 取用户详细数据接口响应中各字段的键名，与接口文档不一致时通过UserInfoService(fields=...)覆盖；
+# 缺少的字段会打印实际收到的键名，到期时间和剩余点数改用各自的接口获取
+DETAIL_FIELDS = {
+    "expiry_time": "ExpireTime",
+    "points": "Point",
+    "mac": "Mac",
+    "data": "Data",
+}
+
+
+def _to_points(value) -> Union[int, str]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _parse_details(payload) -> Optional[dict]:
+    """详细数据应为JSON对象，否则返回None"""
+    if isinstance(payload, str):
+        try:
+            payload = json.loads(payload)
+        except ValueError:
+            return None
+    return payload if isinstance(payload, dict) else None
+
+
+class UserInfo:
+    """用户信息：到期时间、剩余点数和绑定信息；获取失败的字段为None，错误信息记录在对应的error字段"""
+    __slots__ = ("user_name", "expiry_time", "points", "mac", "data", "expiry_error", "points_error")
+
+    def __init__(self, user_name: str, expiry_time: Optional[str] = None, points: Union[int, str, None] = None,
+                 mac: Optional[str] = None, data: Optional[str] = None,
+                 expiry_error: Optional[str] = None, points_error: Optional[str] = None):
+        self.user_name = user_name
+        self.expiry_time = expiry_time
+        self.points = points
+        self.mac = mac
+        self.data = data
+        self.expiry_error = expiry_error
+        self.points_error = points_error
+
+    @classmethod
+    def from_details(cls, user_name: str, payload, fields: Optional[Dict[str, str]] = None) -> Optional["UserInfo"]:
+        """
+        解析取用户详细数据接口的响应，响应不是JSON对象时返回None；缺少的字段为None
+        :param fields: 字段 -> 响应中的键名，默认DETAIL_FIELDS
+        """
+        details = _parse_details(payload)
+        if details is None:
+            return None
+        fields = fields or DETAIL_FIELDS
+        expiry_time = details.get(fields["expiry_time"])
+        points = details.get(fields["points"])
+        return cls(user_name,
+                   str(expiry_time) if expiry_time is not None else None,
+                   _to_points(points) if points is not None else None,
+                   mac=details.get(fields["mac"]), data=details.get(fields["data"]))
+
+    def __repr__(self):
+        return (f"UserInfo(user_name={self.user_name!r}, expiry_time={self.expiry_time!r}, "
+                f"points={self.points!r}, mac={self.mac!r})")
+
+
+class UserInfoService:
+    """
+    获取用户信息：优先一次取用户详细数据，其中缺少的到期时间、剩余点数再用各自的接口获取。
+    详细数据无法解析或两项都缺少时认为服务端不支持，之后直接使用两次调用。
+    """
+
+    def __init__(self, api_client, fields: Optional[Dict[str, str]] = None):
+        """
+        :param fields: 详细数据的字段键名，覆盖DETAIL_FIELDS中的对应项
+        """
+        self.api_client = api_client
+        self.fields = {**DETAIL_FIELDS, **(fields or {})}
+        self.details_supported = True
+
+    def fetch(self, user_name: str, password: Optional[str] = None) -> Tuple[bool, UserInfo]:
+        """
+        :return: (是否至少取到一项, UserInfo)，可直接用于ApiClient.call_many
+        """
+        if self.details_supported:
+            success, payload = self.api_client.get_user_details(user_name, password)
+            if success:
+                info = UserInfo.from_details(user_name, payload, self.fields)
+                if info is None:
+                    self.details_supported = False
+                    print(f"用户详细数据格式无法解析，改为分别获取: {payload!r}")
+                else:
+                    self._check_fields(_parse_details(payload))
+                    if info.expiry_time is not None and info.points is not None:
+                        return True, info
+                    if info.expiry_time is None and info.points is None:
+                        self.details_supported = False
+                    return self.fetch_separately(user_name, password, info)
+        return self.fetch_separately(user_name, password)
+
+    def _check_fields(self, details: dict):
+        """详细数据缺少字段时打印实际收到的键名，便于按接口文档修正fields"""
+        missing = [key for key in self.fields.values() if key not in details]
+        if missing:
+            print(f"用户详细数据缺少字段 {missing}，收到的字段: {sorted(details)}")
+
+    def fetch_separately(self, user_name: str, password: Optional[str] = None,
+                         info: Optional[UserInfo] = None) -> Tuple[bool, UserInfo]:
+        """
+        并发取到期时间和剩余点数
+        :param info: 已有的用户信息，只获取其中为None的字段
+        """
+        info = info or UserInfo(user_name)
+        credentials = (user_name, password)
+        calls = []
+        if info.expiry_time is None:
+            calls.append(("expiry", ("get_expiry_time", credentials)))
+        if info.points is None:
+            calls.append(("points", ("get_remaining_points", credentials)))
+        results = self.api_client.call_many([call for _, call in calls])
+        for (field, _), (success, value, _) in zip(calls, results):
+            if field == "expiry":
+                if success:
+                    info.expiry_time = str(value)
+                else:
+                    info.expiry_error = value
+            elif success:
+                info.points = _to_points(value)
+            else:
+                info.points_error = value
+        return info.expiry_time is not None or info.points is not None, info
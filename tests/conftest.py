@@ -0,0 +1,18 @@
+import os
+import sys
+
+# 源码为平铺模块，与 benchmarks 一样直接把 src 加入搜索路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import pytest  # noqa: E402
+
+from api_simulator import ApiSimulator, SimulatedBackend  # noqa: E402
+
+
+@pytest.fixture
+def simulator():
+    """主、备两个地址的本地模拟服务，已生成 user000001/pass000001 等测试账号"""
+    backend = SimulatedBackend(status_interval=0)
+    backend.seed(users=3, cards=3)
+    with ApiSimulator(backend) as sim:
+        yield sim
@@ -0,0 +1,270 @@
+import threading
+import time
+
+import pytest
+
+from api_client import HEDGEABLE_ENDPOINTS, ApiClient, EndpointType
+from api_errors import ErrorClass
+from endpoint_router import EndpointRouter
+from retry_policy import RetryBudget, RetryPolicy
+
+
+@pytest.fixture
+def client(simulator):
+    api_client = ApiClient("test", "1.0", "test-mac", base_urls=simulator.base_urls)
+    yield api_client
+    api_client.close()
+
+
+def test_probe_rejects_http_error(simulator, client):
+    """返回503的地址探测不通过，与正式请求的判断一致"""
+    primary = simulator.base_urls[0]
+    simulator.set_primary_down("error")
+    assert client._probe_host(primary) is False
+    simulator.set_primary_down("refuse")
+    assert client._probe_host(primary) is False
+    simulator.set_primary_down(None)
+    assert client._probe_host(primary) is True
+
+
+def test_probe_keeps_failing_host_open(simulator, client):
+    primary = simulator.base_urls[0]
+    simulator.set_primary_down("error")
+    router = EndpointRouter(simulator.base_urls, probe=client._probe_host, failure_threshold=1, open_seconds=0)
+    router.record_failure(primary, 0.01)
+    router._run_probe(router._hosts[primary])
+    assert router.get_health()[primary]["circuit_open"]
+    simulator.set_primary_down(None)
+    router._run_probe(router._hosts[primary])
+    assert not router.get_health()[primary]["circuit_open"]
+
+
+@pytest.fixture
+def primary_client(simulator):
+    """只连接主地址的客户端，便于让请求稳定失败"""
+    api_client = ApiClient("test", "1.0", "test-mac", base_urls=simulator.base_urls[:1])
+    yield api_client
+    api_client.close()
+
+
+def _login(api_client):
+    success, token = api_client.user_login("user000001", "pass000001")
+    assert success, token
+    return token
+
+
+def test_retry_does_not_consume_rate_limit(simulator, primary_client):
+    """首次网络失败后的重试不再申请限流许可，不会被本地判为过频"""
+    token = _login(primary_client)
+    post_once = primary_client._post_once
+
+    def recover_after_first_attempt(url, params, timeout=None):
+        result = post_once(url, params, timeout)
+        simulator.set_primary_down(None)
+        return result
+
+    primary_client._post_once = recover_after_first_attempt
+    simulator.set_primary_down("refuse")
+    result = primary_client.check_user_status("user000001", token)
+    assert tuple(result) == (True, "1")
+    metrics = primary_client.get_metrics()
+    assert metrics["retries"] == {"CHECK_USER_STATUS": 1}
+    assert not any(key.endswith("local_throttled") for key in metrics["responses"])
+
+
+def test_host_failure_refunds_rate_limit(simulator, primary_client):
+    """请求未到达服务端时归还许可，恢复后可以立即再次检测"""
+    token = _login(primary_client)
+    simulator.set_primary_down("refuse")
+    result = primary_client.check_user_status("user000001", token)
+    assert not result.success
+    assert result.error_class is ErrorClass.UNAVAILABLE
+
+    simulator.set_primary_down(None)
+    assert tuple(primary_client.check_user_status("user000001", token)) == (True, "1")
+    # 服务端已计入这次检测，180秒内的下一次在本地拒绝
+    throttled = primary_client.check_user_status("user000001", token)
+    assert throttled.error_class is ErrorClass.THROTTLED
+
+
+def test_nested_call_many_runs_inline(simulator):
+    """工作线程中再次调用call_many时在当前线程依次执行，不占用其他工作线程（否则线程池占满时会卡死）"""
+    api_client = ApiClient("test", "1.0", "test-mac", base_urls=simulator.base_urls, max_workers=2)
+    threads = []
+
+    def announcement():
+        threads.append(threading.current_thread())
+        return api_client.get_announcement()
+
+    def nested():
+        threads.append(threading.current_thread())
+        inner = api_client.call_many([announcement, announcement])
+        return all(result.success for result in inner), inner
+
+    try:
+        (result,) = api_client.call_many([nested])
+    finally:
+        api_client.close()
+    assert result.success
+    assert len(threads) == 3 and len(set(threads)) == 1
+
+
+def test_status_check_is_not_hedged():
+    assert EndpointType.CHECK_USER_STATUS not in HEDGEABLE_ENDPOINTS
+
+
+def test_losing_hedge_response_does_not_penalize(simulator):
+    """对冲中落后请求返回的频率错误码不施加冷却"""
+    api_client = ApiClient("test", "1.0", "test-mac", base_urls=simulator.base_urls, hedge=True)
+    api_client.timeout = 0.4  # 主地址无延迟样本时等待超时的一半后对冲
+    primary, secondary = simulator.base_urls
+    loser_done = threading.Event()
+
+    def post_once(url, params, timeout=None):
+        if url == primary:
+            time.sleep(0.3)
+            result = api_client._parse_response("-81015", params)
+            loser_done.set()
+            return result
+        return api_client._parse_response("公告内容", params)
+
+    api_client._post_once = post_once
+    try:
+        assert tuple(api_client.get_announcement()) == (True, "公告内容")
+        assert loser_done.wait(2)
+        assert api_client.governor.try_acquire(EndpointType.GET_ANNOUNCEMENT) == 0
+    finally:
+        api_client.close()
+
+
+def test_final_rate_error_applies_cooldown(primary_client):
+    token = _login(primary_client)
+    primary_client._post_once = lambda url, params, timeout=None: primary_client._parse_response("-81040", params)
+    result = primary_client.check_user_status("user000001", token)
+    assert result.code == -81040
+    assert primary_client.governor.try_acquire(EndpointType.CHECK_USER_STATUS) > 170
+
+
+def test_registered_user_can_login(simulator, client):
+    """注册用户有试用期，注册后即可登录"""
+    success, result = client.user_register("newuser01", "newpass01", "super01", "")
+    assert success, result
+    success, token = client.user_login("newuser01", "newpass01")
+    assert success, token
+
+
+def test_failover_to_secondary(simulator):
+    """主地址拒绝连接时切换到备用地址，之后的请求优先发往备用地址"""
+    primary, secondary = simulator.base_urls
+    simulator.set_primary_down("refuse")
+    api_client = ApiClient("test", "1.0", "test-mac", base_urls=simulator.base_urls, cache_ttls={})
+    try:
+        for _ in range(5):
+            success, _ = api_client.get_announcement()
+            assert success
+        assert api_client.router.ordered_urls()[0] == secondary
+        failovers = api_client.get_metrics()["failovers"]["GET_ANNOUNCEMENT"]
+        assert 1 <= failovers < 5
+        assert api_client.router.get_health()[primary]["consecutive_failures"] == failovers
+    finally:
+        api_client.close()
+
+
+def _failing_client(simulator, retry_budget):
+    simulator.set_primary_down("error")
+    api_client = ApiClient("test", "1.0", "test-mac", base_urls=simulator.base_urls[:1], cache_ttls={},
+                           retry_policy=RetryPolicy(max_attempts=3, base_delay=0.01, jitter=0))
+    api_client.retry_budget = retry_budget
+    return api_client
+
+
+def test_retry_read_only_call(simulator):
+    api_client = _failing_client(simulator, RetryBudget())
+    try:
+        success, _ = api_client.get_announcement()
+        assert not success
+        assert api_client.get_metrics()["retries"]["GET_ANNOUNCEMENT"] == 2
+    finally:
+        api_client.close()
+
+
+def test_retry_budget_exhausted(simulator):
+    """重试预算耗尽后失败的调用不再重试"""
+    api_client = _failing_client(simulator, RetryBudget(ratio=0, min_tokens=1))
+    try:
+        api_client.get_announcement()
+        api_client.get_announcement()
+        assert api_client.get_metrics()["retries"]["GET_ANNOUNCEMENT"] == 1
+    finally:
+        api_client.close()
+
+
+def test_write_call_is_not_retried(simulator):
+    api_client = _failing_client(simulator, RetryBudget())
+    try:
+        success, _ = api_client.user_login("user000001", "pass000001")
+        assert not success
+        assert "USER_LOGIN" not in api_client.get_metrics()["retries"]
+    finally:
+        api_client.close()
+
+
+def test_session_shared_per_base_url(simulator):
+    """同一地址在多个线程中首次使用时也只创建一个会话，不同地址使用不同会话"""
+    api_client = ApiClient("test", "1.0", "test-mac", base_urls=simulator.base_urls)
+    primary, secondary = simulator.base_urls
+    barrier = threading.Barrier(8)
+    sessions = []
+
+    def get_session():
+        barrier.wait()
+        sessions.append(api_client._get_session(primary))
+
+    threads = [threading.Thread(target=get_session) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    try:
+        assert len(sessions) == 8 and all(session is sessions[0] for session in sessions)
+        assert api_client._get_session(secondary) is not sessions[0]
+    finally:
+        api_client.close()
+
+
+def test_session_pool_configuration(simulator):
+    api_client = ApiClient("test", "1.0", "test-mac", base_urls=simulator.base_urls,
+                           pool_connections=2, pool_maxsize=7)
+    try:
+        session = api_client._get_session(simulator.base_urls[0])
+        adapter = session.get_adapter(simulator.base_urls[0])
+        assert adapter._pool_connections == 2 and adapter._pool_maxsize == 7
+        assert session.headers["Connection"] == "keep-alive"
+    finally:
+        api_client.close()
+
+
+def test_session_reuses_connection(simulator, primary_client):
+    """连续调用复用同一个长连接"""
+    for _ in range(5):
+        success, _ = primary_client.get_latest_version()
+        assert success
+        primary_client.cache.clear()
+    primary = simulator.base_urls[0]
+    pool = primary_client._get_session(primary).get_adapter(primary).poolmanager.connection_from_url(primary)
+    assert pool.num_connections == 1
+
+
+def test_close_releases_sessions(simulator, client):
+    primary = simulator.base_urls[0]
+    assert client.get_announcement()[0]
+    session = client._get_session(primary)
+    adapter = session.get_adapter(primary)
+    assert len(adapter.poolmanager.pools) == 1
+    client.close()
+    assert client._sessions == {}
+    assert len(adapter.poolmanager.pools) == 0
+    # 关闭后再调用会创建新的会话
+    client.cache.clear()
+    assert client.get_announcement()[0]
+    assert client._get_session(primary) is not session
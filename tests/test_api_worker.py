@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+from PyQt5.QtCore import QCoreApplication
+
+from api_worker import ApiWorker
+
+
+@pytest.fixture(scope="module", autouse=True)
+def qt_app():
+    app = QCoreApplication.instance() or QCoreApplication([])
+    yield app
+
+
+@pytest.fixture
+def worker():
+    api_worker = ApiWorker(max_threads=2)
+    yield api_worker
+    api_worker.cancel_all()
+    api_worker.wait()
+
+
+def _drain(worker):
+    """等待线程池结束并派发排队的结果信号"""
+    assert worker.wait(5000)
+    QCoreApplication.processEvents()
+
+
+def test_same_tag_keeps_latest_result(worker):
+    release = threading.Event()
+    results = []
+    worker.submit("status", lambda: release.wait(5) and "old", on_result=results.append)
+    worker.submit("status", lambda: "new", on_result=results.append)
+    release.set()
+    _drain(worker)
+    assert results == ["new"]
+    assert not worker.is_busy("status")
+    assert not worker._pending
+
+
+def test_different_tags_both_deliver(worker):
+    """公告轮询与点击显示使用不同tag，互不取消"""
+    results = []
+    worker.submit("announcement_check", lambda: "check", on_result=results.append)
+    worker.submit("announcement_show", lambda: "show", on_result=results.append)
+    _drain(worker)
+    assert sorted(results) == ["check", "show"]
+
+
+def test_error_delivered(worker):
+    errors = []
+
+    def fail():
+        raise ValueError("boom")
+
+    worker.submit("login", fail, on_error=errors.append)
+    _drain(worker)
+    assert errors == ["boom"]
+
+
+def test_cancel_discards_result(worker):
+    release = threading.Event()
+    results = []
+    worker.submit("status", lambda: release.wait(5) and "late", on_result=results.append)
+    worker.cancel("status")
+    release.set()
+    _drain(worker)
+    assert results == []
+    assert not worker._pending  # 取消时仍在执行的调用结束后才释放
+
+
+def test_cancel_before_start(worker):
+    release = threading.Event()
+    started = []
+    for tag in ("a", "b"):
+        worker.submit(tag, lambda: release.wait(5))
+    worker.submit("queued", started.append, 1)
+    worker.cancel("queued")
+    release.set()
+    _drain(worker)
+    assert started == []
+    assert not worker._pending
@@ -0,0 +1,71 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from api_client import ApiClient, EndpointType
+from api_errors import ErrorClass
+from async_api_client import AsyncApiClient
+
+
+class BrokenServer:
+    """返回异常响应的接口地址：truncated为响应体不完整，undecodable为声明UTF-8但内容无法解码"""
+
+    def __init__(self, mode: str):
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                body = b"\xff\xfe\xfd" if mode == "undecodable" else b"1"
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; charset=utf-8")
+                self.send_header("Content-Length", str(len(body) + (100 if mode == "truncated" else 0)))
+                self.end_headers()
+                self.wfile.write(body)
+                self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture(params=["truncated", "undecodable"])
+def broken(request):
+    server = BrokenServer(request.param)
+    yield server
+    server.close()
+
+
+def test_async_bad_response_fails_over(simulator, broken):
+    """响应体异常时返回UNAVAILABLE结果并切换备用地址，而不是把异常抛给调用方"""
+    async def run():
+        urls = [broken.url, simulator.base_urls[1]]
+        async with AsyncApiClient("test", "1.0", "test-mac", base_urls=urls, cache_ttls={}) as client:
+            params = client._build_params(EndpointType.GET_ANNOUNCEMENT)
+            result = await client._post_once_async(broken.url, params)
+            assert not result.success and result.error_class == ErrorClass.UNAVAILABLE
+            success, announcement = await client.get_announcement()
+            assert success, announcement
+            assert client.router.get_health()[broken.url]["consecutive_failures"] == 2
+
+    asyncio.run(run())
+
+
+def test_sync_truncated_response_fails_over(simulator):
+    broken = BrokenServer("truncated")
+    client = ApiClient("test", "1.0", "test-mac", base_urls=[broken.url, simulator.base_urls[1]], cache_ttls={})
+    try:
+        success, announcement = client.get_announcement()
+        assert success, announcement
+        assert client.router.get_health()[broken.url]["consecutive_failures"] == 1
+    finally:
+        client.close()
+        broken.close()
@@ -0,0 +1,45 @@
+import os
+import random
+
+import pytest
+
+from delta_patch import PatchError, _mutate, _random_bytes, apply_patch, make_patch, selftest
+
+
+def _roundtrip(tmp_path, old_data: bytes, new_data: bytes) -> int:
+    old_path, new_path = tmp_path / "old.bin", tmp_path / "new.bin"
+    patch_path, out_path = tmp_path / "new.patch", tmp_path / "out.bin"
+    old_path.write_bytes(old_data)
+    new_path.write_bytes(new_data)
+    patch_size = make_patch(str(old_path), str(new_path), str(patch_path))
+    apply_patch(str(old_path), str(patch_path), str(out_path))
+    assert out_path.read_bytes() == new_data
+    return patch_size
+
+
+def test_small_change_gives_small_patch(tmp_path):
+    rng = random.Random(1)
+    old_data = _random_bytes(rng, 1024 * 1024)
+    assert _roundtrip(tmp_path, old_data, _mutate(old_data, 5, rng)) < 64 * 1024
+
+
+def test_empty_files(tmp_path):
+    _roundtrip(tmp_path, b"", os.urandom(4096))
+    _roundtrip(tmp_path, os.urandom(4096), b"")
+
+
+def test_match_extends_backwards_over_long_run(tmp_path):
+    """匹配起点之前的长段相同数据应并入复制操作，而不是作为插入数据"""
+    old_data = bytes(1024 * 1024) + os.urandom(64 * 1024)
+    assert _roundtrip(tmp_path, old_data, os.urandom(100) + old_data) < 4096
+
+
+def test_wrong_old_file_rejected(tmp_path):
+    _roundtrip(tmp_path, os.urandom(4096), os.urandom(4096))
+    (tmp_path / "other.bin").write_bytes(os.urandom(4096))
+    with pytest.raises(PatchError):
+        apply_patch(str(tmp_path / "other.bin"), str(tmp_path / "new.patch"), str(tmp_path / "out.bin"))
+
+
+def test_selftest():
+    assert selftest(256 * 1024, 10, seed=1)
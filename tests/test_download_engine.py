@@ -0,0 +1,197 @@
+import hashlib
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PyQt5.QtCore import Qt
+
+from download_engine import DownloadCancelled, DownloadEngine, RemoteFileChanged
+
+SIZE = 1024 * 1024
+SEGMENT = 128 * 1024
+
+
+class FileServer:
+    """本地文件服务：支持Range、ETag和If-Range，可随时替换文件内容"""
+
+    def __init__(self, payload: bytes, ranges: bool = True):
+        self.payload = payload  # /setup.exe 的内容
+        self.files = {}  # 其他路径 -> 内容，未列出的路径返回404
+        self.truncated = set()  # 只发送一半内容就断开的路径
+        self.ranges = ranges
+        self.paths = []  # 收到请求的路径
+        self.on_request = None  # 每次请求前调用，参数为请求头
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.paths.append(self.path)
+                if server.on_request is not None:
+                    server.on_request(self.headers)
+                payload = server.payload if self.path == "/setup.exe" else server.files.get(self.path)
+                if payload is None:
+                    self.send_error(404)
+                    return
+                etag = '"%s"' % hashlib.sha1(payload).hexdigest()
+                start, end = 0, len(payload) - 1
+                range_header = self.headers.get("Range")
+                if_range = self.headers.get("If-Range")
+                if server.ranges and range_header and (if_range is None or if_range == etag):
+                    first, _, last = range_header[6:].partition("-")
+                    start, end = int(first), min(int(last), end)
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{len(payload)}")
+                else:
+                    self.send_response(200)
+                if server.ranges:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(end - start + 1))
+                self.end_headers()
+                if self.path in server.truncated:
+                    end = start + (end - start) // 2
+                    self.close_connection = True
+                try:
+                    self.wfile.write(payload[start:end + 1])
+                except ConnectionError:
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/setup.exe"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    file_server = FileServer(os.urandom(SIZE))
+    yield file_server
+    file_server.close()
+
+
+def _engine(url, path, **kwargs):
+    return DownloadEngine(url, str(path), segments=4, min_segment_size=SEGMENT, **kwargs)
+
+
+def _interrupt(engine):
+    """限速下载并在中途取消，留下续传进度"""
+    engine.set_max_rate(SIZE)
+    thread = threading.Thread(target=lambda: pytest.raises(DownloadCancelled, engine.run), daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while engine.downloaded < SIZE // 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    engine.cancel()
+    thread.join(5)
+    assert 0 < engine.downloaded < SIZE
+
+
+def test_segmented_download_and_hash(server, tmp_path):
+    engine = _engine(server.url, tmp_path / "setup.exe")
+    path = engine.run()
+    data = open(path, "rb").read()
+    assert data == server.payload
+    assert engine.sha256 == hashlib.sha256(data).hexdigest()
+    assert not os.path.exists(engine.part_path) and not os.path.exists(engine.state_path)
+
+
+def test_expected_hash_mismatch_discards_download(server, tmp_path):
+    engine = _engine(server.url, tmp_path / "setup.exe", expected_sha256="0" * 64)
+    with pytest.raises(IOError, match="校验失败"):
+        engine.run()
+    assert not os.path.exists(engine.part_path) and not os.path.exists(engine.state_path)
+    assert not os.path.exists(tmp_path / "setup.exe")
+
+
+def test_resume_after_cancel(server, tmp_path, capsys):
+    _interrupt(_engine(server.url, tmp_path / "setup.exe"))
+    engine = _engine(server.url, tmp_path / "setup.exe", expected_sha256=hashlib.sha256(server.payload).hexdigest())
+    assert open(engine.run(), "rb").read() == server.payload
+    assert "继续上次的下载" in capsys.readouterr().out
+
+
+def test_resume_rejected_when_file_changed_with_same_size(server, tmp_path, capsys):
+    """文件大小不变但内容已更新时不使用旧的分段"""
+    _interrupt(_engine(server.url, tmp_path / "setup.exe"))
+    server.payload = os.urandom(SIZE)
+    capsys.readouterr()
+    engine = _engine(server.url, tmp_path / "setup.exe")
+    assert open(engine.run(), "rb").read() == server.payload
+    assert "继续上次的下载" not in capsys.readouterr().out
+
+
+def test_file_changed_during_download(server, tmp_path):
+    """下载中途文件更新时If-Range不匹配，放弃已下载部分"""
+    requests_seen = []
+
+    def replace_after_probe(headers):
+        requests_seen.append(headers.get("If-Range"))
+        if len(requests_seen) == 2:
+            server.payload = os.urandom(SIZE)
+
+    server.on_request = replace_after_probe
+    engine = _engine(server.url, tmp_path / "setup.exe")
+    with pytest.raises(RemoteFileChanged):
+        engine.run()
+    assert requests_seen[0] is None and requests_seen[1] is not None
+    assert not os.path.exists(engine.part_path) and not os.path.exists(engine.state_path)
+
+    server.on_request = None
+    engine = _engine(server.url, tmp_path / "setup.exe")
+    assert open(engine.run(), "rb").read() == server.payload
+
+
+def test_stream_without_range(tmp_path):
+    file_server = FileServer(os.urandom(SIZE), ranges=False)
+    try:
+        engine = _engine(file_server.url, tmp_path / "setup.exe")
+        path = engine.run()
+        assert open(path, "rb").read() == file_server.payload
+        assert engine.sha256 == hashlib.sha256(file_server.payload).hexdigest()
+    finally:
+        file_server.close()
+
+
+def _run_thread(thread):
+    results = []
+    thread.finished.connect(results.append, Qt.DirectConnection)
+    thread.error.connect(lambda message: results.append(IOError(message)), Qt.DirectConnection)
+    thread.run()
+    assert len(results) == 1 and not isinstance(results[0], Exception), results
+    return results[0]
+
+
+def test_download_thread_without_base_skips_patch(server, tmp_path):
+    """没有缓存的当前版本时不请求补丁"""
+    from login_window import DownloadThread
+    thread = DownloadThread(server.url, str(tmp_path / "setup.exe"), base_version="1.0")
+    assert thread.patch_engine is None
+    path = _run_thread(thread)
+    assert open(path, "rb").read() == server.payload
+    assert not any(".patch" in request_path for request_path in server.paths)
+
+
+def test_failed_patch_download_is_cleaned_up(server, tmp_path):
+    """补丁下载失败时改为下载完整安装包，并删除未完成的补丁文件"""
+    from login_window import DownloadThread
+    base_path = tmp_path / "setup-1.0.exe"
+    base_path.write_bytes(os.urandom(SIZE))
+    server.files["/setup.exe.1.0.patch"] = os.urandom(SIZE)
+    server.truncated.add("/setup.exe.1.0.patch")
+    download_dir = tmp_path / "update"
+    download_dir.mkdir()
+    thread = DownloadThread(server.url, str(download_dir / "setup.exe"),
+                            base_path=str(base_path), base_version="1.0")
+    thread.patch_engine.retries = 0
+    path = _run_thread(thread)
+    assert open(path, "rb").read() == server.payload
+    assert "/setup.exe.1.0.patch" in server.paths
+    assert os.listdir(download_dir) == ["setup.exe"]
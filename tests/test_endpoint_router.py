@@ -0,0 +1,74 @@
+from endpoint_router import EndpointRouter
+
+PRIMARY = "http://primary"
+SECONDARY = "http://secondary"
+
+
+def test_failure_threshold_opens_circuit():
+    router = EndpointRouter([PRIMARY, SECONDARY], failure_threshold=3)
+    for _ in range(2):
+        router.record_failure(PRIMARY, 0.1)
+    assert not router.get_health()[PRIMARY]["circuit_open"]
+    router.record_failure(PRIMARY, 0.1)
+    health = router.get_health()
+    assert health[PRIMARY]["circuit_open"]
+    assert health[SECONDARY]["current"]
+    assert router.ordered_urls() == [SECONDARY]
+
+
+def test_success_resets_consecutive_failures():
+    router = EndpointRouter([PRIMARY, SECONDARY], failure_threshold=3)
+    router.record_failure(PRIMARY, 0.1)
+    router.record_failure(PRIMARY, 0.1)
+    router.record_success(PRIMARY, 0.1)
+    router.record_failure(PRIMARY, 0.1)
+    assert not router.get_health()[PRIMARY]["circuit_open"]
+
+
+def test_all_open_falls_back_to_best_score():
+    """全部熔断时仍返回所有地址作为兜底，兜底请求成功即恢复该地址"""
+    router = EndpointRouter([PRIMARY, SECONDARY], failure_threshold=1)
+    router.record_failure(PRIMARY, 1.0)
+    router.record_failure(SECONDARY, 0.1)
+    assert router.ordered_urls() == [SECONDARY, PRIMARY]
+    router.record_success(SECONDARY, 0.1)
+    assert router.ordered_urls() == [SECONDARY]
+
+
+def test_sticky_current_host():
+    """其他地址只是略快时不切换，明显更好时才切换"""
+    router = EndpointRouter([PRIMARY, SECONDARY], alpha=1.0, stickiness=1.5)
+    router.record_success(PRIMARY, 0.10)
+    router.record_success(SECONDARY, 0.08)
+    assert router.ordered_urls()[0] == PRIMARY
+    router.record_success(SECONDARY, 0.05)
+    assert router.ordered_urls()[0] == SECONDARY
+
+
+def test_failed_probe_doubles_cooldown():
+    router = EndpointRouter([PRIMARY, SECONDARY], probe=lambda url: False,
+                            failure_threshold=1, open_seconds=10, max_open_seconds=30)
+    router.record_failure(PRIMARY, 0.1)
+    host = router._hosts[PRIMARY]
+    for expected in (20, 30, 30):
+        router._run_probe(host)
+        assert host.circuit_open and host.cooldown == expected
+
+
+def test_successful_probe_closes_circuit():
+    router = EndpointRouter([PRIMARY, SECONDARY], probe=lambda url: True, failure_threshold=1)
+    router.record_failure(PRIMARY, 0.1)
+    router._run_probe(router._hosts[PRIMARY])
+    health = router.get_health()[PRIMARY]
+    assert not health["circuit_open"] and health["consecutive_failures"] == 0
+    assert PRIMARY in router.ordered_urls()
+
+
+def test_probe_exception_counts_as_failure():
+    def probe(url):
+        raise OSError("unreachable")
+
+    router = EndpointRouter([PRIMARY, SECONDARY], probe=probe, failure_threshold=1)
+    router.record_failure(PRIMARY, 0.1)
+    router._run_probe(router._hosts[PRIMARY])
+    assert router.get_health()[PRIMARY]["circuit_open"]
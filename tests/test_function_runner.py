@@ -0,0 +1,153 @@
+import threading
+import time
+
+import pytest
+from PyQt5.QtCore import QCoreApplication, Qt
+
+from function_runner import CancelToken, FunctionRunner
+
+
+@pytest.fixture(scope="module", autouse=True)
+def qt_app():
+    app = QCoreApplication.instance() or QCoreApplication([])
+    yield app
+
+
+def _collect(runner):
+    messages = []
+    # 直接在工作线程中调用，不依赖事件循环
+    runner.result_ready.connect(messages.append, Qt.DirectConnection)
+    return messages
+
+
+def test_passes_results_to_next_step():
+    runner = FunctionRunner([lambda: ("a", 1), lambda value: ("b", value + 1), lambda value: str(value)], loop=False)
+    messages = _collect(runner)
+    runner.run()
+    assert messages == ["a", "b", "2"]
+
+
+def test_timed_out_step_is_not_rerun():
+    """超时的步骤只执行一次，之后停止运行"""
+    calls = []
+
+    def slow_step(*params):
+        calls.append(params)
+        time.sleep(0.15)
+        return ("done",)
+
+    runner = FunctionRunner([slow_step, lambda *params: "next"], loop=False, timeout=0.1)
+    messages = _collect(runner)
+    runner.start()
+    assert runner.wait(2000)
+    assert len(calls) == 1
+    assert messages == ["done", "Error: 步骤执行超过0.1秒，已停止运行"]
+
+
+def test_timeout_attribute_overrides_default():
+    def slow_step(*params):
+        time.sleep(0.1)
+        return "late"
+
+    slow_step.timeout = 0.05
+    runner = FunctionRunner([slow_step], loop=True, timeout=10)
+    messages = _collect(runner)
+    runner.start()
+    assert runner.wait(2000)
+    assert messages[-1].startswith("Error: 步骤执行超过0.05秒")
+
+
+def test_cancel_token_ends_step_at_deadline():
+    def waiting_step(*params, cancel_token):
+        if cancel_token.wait(10):
+            return "cancelled"
+        return "finished"
+
+    runner = FunctionRunner([waiting_step], loop=False, timeout=0.1)
+    messages = _collect(runner)
+    start = time.monotonic()
+    runner.run()
+    assert time.monotonic() - start < 1
+    assert messages == ["cancelled", "Error: 步骤执行超过0.1秒，已停止运行"]
+
+
+def test_stop_is_immediate_and_cancels_step():
+    started = threading.Event()
+
+    def waiting_step(*params, cancel_token):
+        started.set()
+        cancel_token.wait(10)
+        return "cancelled"
+
+    runner = FunctionRunner([waiting_step])
+    messages = _collect(runner)
+    runner.start()
+    assert started.wait(2)
+    begin = time.monotonic()
+    runner.stop()
+    assert time.monotonic() - begin < 0.05
+    assert runner.wait(1000)
+    assert messages == ["cancelled"]
+
+
+def test_stop_does_not_wait_for_plain_step():
+    started = threading.Event()
+
+    def blocking_step(*params):
+        started.set()
+        time.sleep(0.3)
+        return "done"
+
+    runner = FunctionRunner([blocking_step])
+    runner.start()
+    assert started.wait(2)
+    begin = time.monotonic()
+    runner.stop()
+    assert time.monotonic() - begin < 0.05
+    assert runner.is_stopping()
+    assert runner.wait(2000)
+
+
+def test_pause_and_resume():
+    calls = []
+    runner = FunctionRunner([lambda *params: calls.append(1) or "step"])
+    runner.pause()
+    runner.start()
+    time.sleep(0.1)
+    assert calls == []
+    runner.resume()
+    deadline = time.monotonic() + 2
+    while not calls and time.monotonic() < deadline:
+        time.sleep(0.001)
+    runner.pause()
+    time.sleep(0.05)
+    count = len(calls)
+    time.sleep(0.1)
+    assert len(calls) == count > 0
+    runner.stop()
+    assert runner.wait(1000)
+
+
+def test_token_only_passed_when_declared():
+    received = []
+
+    def with_token(*params, cancel_token):
+        received.append(cancel_token)
+        return "a", 1
+
+    def without_token(*params, **kwargs):
+        received.append(kwargs)
+        return "b"
+
+    runner = FunctionRunner([with_token, without_token], loop=False)
+    runner.run()
+    assert isinstance(received[0], CancelToken)
+    assert received[1] == {}
+
+
+def test_example_function_without_token():
+    import main
+    assert main.function10(1) == ("2", 2)
+    token = CancelToken()
+    token.cancel()
+    assert main.function10(1, cancel_token=token) == ("已取消", 1)
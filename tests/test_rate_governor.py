@@ -0,0 +1,60 @@
+import time
+
+from rate_governor import RateGovernor, TokenBucket
+
+
+def test_token_bucket_refill_and_refund():
+    bucket = TokenBucket(2, 1.0)
+    now = bucket.updated
+    bucket.consume()
+    bucket.consume()
+    assert bucket.wait_time(now) > 0
+    bucket.refund()
+    assert bucket.wait_time(now) == 0
+    bucket.refund()
+    bucket.refund()
+    assert bucket.tokens == 2  # 归还不超过容量
+    bucket.consume()
+    bucket.consume()
+    assert bucket.wait_time(now + 1.0) == 0
+
+
+def test_rejects_when_wait_exceeds_max_wait():
+    governor = RateGovernor({"status": (1, 60)}, max_wait=0.5)
+    assert governor.acquire("status") == 0
+    assert governor.acquire("status") > 0.5
+    assert governor.acquire("other") == 0  # 未配置且无默认限额的接口不限流
+
+
+def test_acquire_waits_within_max_wait():
+    governor = RateGovernor({"status": (1, 0.1)}, max_wait=1.0)
+    assert governor.acquire("status") == 0
+    start = time.monotonic()
+    assert governor.acquire("status") == 0
+    assert time.monotonic() - start >= 0.05
+
+
+def test_global_limit_shared_by_endpoints():
+    governor = RateGovernor({}, default_limit=(10, 60), global_limit=(2, 60), max_wait=0)
+    assert governor.acquire("a") == 0
+    assert governor.acquire("b") == 0
+    assert governor.acquire("c") > 0
+
+
+def test_refund_returns_endpoint_and_global_tokens():
+    governor = RateGovernor({"status": (1, 60)}, global_limit=(1, 60), max_wait=0)
+    assert governor.acquire("status") == 0
+    assert governor.acquire("status") > 0
+    governor.refund("status")
+    assert governor.acquire("status") == 0
+
+
+def test_penalize_and_reset():
+    governor = RateGovernor({}, max_wait=0)
+    governor.penalize("status", 30)
+    assert governor.acquire("status") > 29
+    assert governor.acquire("login") == 0
+    governor.reset("status")
+    assert governor.acquire("status") == 0
+    governor.penalize(None, 30)
+    assert governor.acquire("login") > 29
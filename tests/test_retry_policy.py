@@ -0,0 +1,25 @@
+from retry_policy import RetryBudget, RetryPolicy
+
+
+def test_backoff_grows_and_is_capped():
+    policy = RetryPolicy(base_delay=0.2, max_delay=1.0, multiplier=2.0, jitter=0)
+    assert [policy.backoff(attempt) for attempt in range(1, 5)] == [0.2, 0.4, 0.8, 1.0]
+
+
+def test_backoff_jitter_range():
+    policy = RetryPolicy(base_delay=1.0, jitter=0.5)
+    for _ in range(100):
+        assert 0.5 <= policy.backoff(1) <= 1.0
+
+
+def test_budget_limits_retries():
+    budget = RetryBudget(ratio=0.5, min_tokens=2, max_tokens=3)
+    assert budget.withdraw() and budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert not budget.withdraw()  # 两个正常请求才攒够一次重试
+    budget.deposit()
+    assert budget.withdraw()
+    for _ in range(100):
+        budget.deposit()
+    assert sum(budget.withdraw() for _ in range(10)) == 3
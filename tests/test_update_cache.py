@@ -0,0 +1,68 @@
+import hashlib
+import os
+
+from update_cache import UpdateCache, split_expected_hash
+
+
+def _store(cache, tmp_path, url, content, version):
+    path = tmp_path / f"download-{version}.exe"
+    path.write_bytes(content)
+    return cache.store(url, str(path), hashlib.sha256(content).hexdigest(), version)
+
+
+def test_same_url_two_versions(tmp_path):
+    """下载地址固定时，按版本区分缓存，不能把旧版本当作新版本返回"""
+    cache = UpdateCache(str(tmp_path / "cache"))
+    url = "http://example.com/setup.exe"
+    old_path = _store(cache, tmp_path, url, b"old installer", "1.0")
+
+    assert cache.lookup(url, version="1.1") is None
+    assert cache.lookup(url, version="1.0") == old_path
+
+    new_path = _store(cache, tmp_path, url, b"new installer", "1.1")
+    assert cache.lookup(url, version="1.1") == new_path
+    assert cache.lookup(url, version="1.0") == old_path
+
+
+def test_lookup_without_hash_or_version_misses(tmp_path):
+    cache = UpdateCache(str(tmp_path / "cache"))
+    url = "http://example.com/setup.exe"
+    _store(cache, tmp_path, url, b"installer", "1.0")
+    assert cache.lookup(url) is None
+
+
+def test_lookup_by_hash_ignores_url(tmp_path):
+    cache = UpdateCache(str(tmp_path / "cache"))
+    content = b"installer"
+    path = _store(cache, tmp_path, "http://a.example.com/setup.exe", content, "1.0")
+    digest = hashlib.sha256(content).hexdigest()
+    assert cache.lookup("http://b.example.com/setup.exe", digest) == path
+    assert cache.lookup("http://a.example.com/setup.exe", "0" * 64) is None
+
+
+def test_lookup_drops_modified_file(tmp_path):
+    cache = UpdateCache(str(tmp_path / "cache"))
+    url = "http://example.com/setup.exe"
+    path = _store(cache, tmp_path, url, b"installer", "1.0")
+    with open(path, "ab") as f:
+        f.write(b"tampered")
+    assert cache.lookup(url, version="1.0") is None
+    assert cache.find_version("1.0") is None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = UpdateCache(str(tmp_path / "cache"), max_bytes=20)
+    url = "http://example.com/setup.exe"
+    first = _store(cache, tmp_path, url, b"a" * 10, "1.0")
+    second = _store(cache, tmp_path, url, b"b" * 10, "1.1")
+    cache.lookup(url, version="1.0")  # 1.0 变为最近使用
+    _store(cache, tmp_path, url, b"c" * 10, "1.2")
+    assert os.path.exists(first)
+    assert not os.path.exists(second)
+    assert cache.find_version("1.1") is None
+
+
+def test_split_expected_hash():
+    digest = "A" * 64
+    assert split_expected_hash(f"http://x/setup.exe#sha256={digest}") == ("http://x/setup.exe", "a" * 64)
+    assert split_expected_hash("http://x/setup.exe") == ("http://x/setup.exe", None)
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from api_client import ApiClient
+from login_window import UpdateCheckThread
+
+
+@pytest.fixture
+def client(simulator):
+    api_client = ApiClient("test", "1.0", "test-mac", base_urls=simulator.base_urls, cache_ttls={})
+    yield api_client
+    api_client.close()
+
+
+def _check(client, cache_path, ttl=600):
+    results = []
+    thread = UpdateCheckThread(client, cache_path=str(cache_path), ttl=ttl)
+    thread.checked.connect(results.append)
+    thread.run()
+    return results[0]
+
+
+def _version_requests(simulator):
+    return simulator.backend.request_counts.get("GET_LATEST_VERSION", 0)
+
+
+def test_up_to_date_result_not_cached(simulator, client, tmp_path):
+    """当前已是最新版本时每次都重新检查，新版本发布后立即可见"""
+    cache_path = tmp_path / "update_check.json"
+    assert _check(client, cache_path)["download_url"] is None
+    simulator.backend.latest_version = "2.0"
+    result = _check(client, cache_path)
+    assert result["latest_version"] == "2.0" and result["download_url"]
+    assert _version_requests(simulator) == 2
+
+
+def test_new_version_result_cached(simulator, client, tmp_path):
+    simulator.backend.latest_version = "2.0"
+    cache_path = tmp_path / "update_check.json"
+    first = _check(client, cache_path)
+    assert _check(client, cache_path) == first
+    assert _version_requests(simulator) == 1
+
+
+def test_zero_ttl_disables_cache(simulator, client, tmp_path):
+    simulator.backend.latest_version = "2.0"
+    cache_path = tmp_path / "update_check.json"
+    _check(client, cache_path, ttl=0)
+    _check(client, cache_path, ttl=0)
+    assert _version_requests(simulator) == 2
+    assert not cache_path.exists()
+
+
+def test_cached_up_to_date_result_ignored(simulator, client, tmp_path):
+    """旧版本程序写入的“已是最新版本”缓存不再采用"""
+    cache_path = tmp_path / "update_check.json"
+    thread = UpdateCheckThread(client, cache_path=str(cache_path))
+    thread.save_cache({"latest_version": "1.0", "download_url": None, "error": None})
+    simulator.backend.latest_version = "2.0"
+    assert _check(client, cache_path)["latest_version"] == "2.0"
+    assert json.loads(cache_path.read_text(encoding="utf-8"))["result"]["latest_version"] == "2.0"
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from api_client import ApiClient
+from user_info import UserInfoService
+
+
+@pytest.fixture
+def client(simulator):
+    api_client = ApiClient("test", "1.0", "test-mac", base_urls=simulator.base_urls)
+    yield api_client
+    api_client.close()
+
+
+def test_fetch_from_details(simulator, client):
+    service = UserInfoService(client)
+    success, info = service.fetch("user000001", "pass000001")
+    assert success
+    assert info.points == 100
+    assert info.expiry_time
+    assert service.details_supported
+
+
+def test_missing_detail_keys_are_reported_and_fetched_separately(client, capsys):
+    """详细数据键名与配置不符时打印收到的键名，并用各自的接口取到期时间和点数"""
+    client.get_user_details = lambda user_name, password=None: (True, json.dumps({"EndDate": "2030-01-01"}))
+    service = UserInfoService(client)
+    success, info = service.fetch("user000001", "pass000001")
+    assert success
+    assert info.points == 100
+    assert info.expiry_time and info.expiry_time != "2030-01-01"
+    assert "EndDate" in capsys.readouterr().out
+    assert not service.details_supported
+
+
+def test_partial_details_fetch_only_missing_field(client):
+    client.get_user_details = lambda user_name, password=None: (True, json.dumps({"ExpireTime": "2030-01-01"}))
+    fetched = []
+    get_remaining_points = client.get_remaining_points
+
+    def counting(*args):
+        fetched.append("points")
+        return get_remaining_points(*args)
+
+    client.get_remaining_points = counting
+    service = UserInfoService(client)
+    success, info = service.fetch("user000001", "pass000001")
+    assert success
+    assert info.expiry_time == "2030-01-01"
+    assert info.points == 100
+    assert fetched == ["points"]
+    assert service.details_supported
+
+
+def test_custom_field_names(client):
+    client.get_user_details = lambda user_name, password=None: (True, json.dumps({"EndDate": "2030-01-01", "Balance": "7"}))
+    success, info = UserInfoService(client, fields={"expiry_time": "EndDate", "points": "Balance"}).fetch("user000001")
+    assert success
+    assert (info.expiry_time, info.points) == ("2030-01-01", 7)
+
+
+def test_errors_are_surfaced(client):
+    success, info = UserInfoService(client).fetch("user000001", "wrong-password")
+    assert not success
+    assert info.expiry_error and info.points_error